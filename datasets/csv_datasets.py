@@ -62,16 +62,23 @@ def _parse_type(t):
         return converter, int_type.IntType.from_string(match[2])
 
 
+def parse_types(types_line):
+    """Parse the types row of a CSV file.
+    Returns list of converter functions and list of converted types."""
+    converters = []
+    field_types = []
+    for t in [x.strip() for x in types_line.split(",")]:
+        converter, converted_t = _parse_type(t)
+        converters.append(converter)
+        field_types.append(converted_t)
+    return converters, field_types
+
+
 def _open_dataset(csv_path, csv_name):
     with open(csv_path, "r") as fp:
         field_names = [x.strip() for x in next(fp).split(",")]
 
-        field_types = []
-        converters = []
-        for t in [x.strip() for x in next(fp).split(",")]:
-            converter, converted_t = _parse_type(t)
-            field_types.append(converted_t)
-            converters.append(converter)
+        converters, field_types = parse_types(next(fp))
 
     iter_callable = _CsvDataIterCallable(csv_path, converters)
 
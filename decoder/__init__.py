@@ -1,3 +1,4 @@
 from .decoder import TablogDecoder
+from .push_decoder import TablogPushDecoder
 
-__all__ = ["TablogDecoder"]
+__all__ = ["TablogDecoder", "TablogPushDecoder"]
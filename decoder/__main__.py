@@ -0,0 +1,5 @@
+from .convert import main
+
+import sys
+
+sys.exit(main())
@@ -0,0 +1,244 @@
+"""Conversion of a whole directory tree of encoded files using multiple processes.
+
+Usage:
+    python -m decoder.batch INPUT_DIR OUTPUT_DIR [--format csv|npy]
+        [--pattern GLOB] [--workers N] [--columns NAME,...]
+        [--scale NAME=MULTIPLIER ...] [--types] [--manifest PATH]
+
+Every file in INPUT_DIR matching the pattern is converted (see module `convert`)
+to the same relative path in OUTPUT_DIR, with the suffix replaced by .csv,
+or to a directory of .npy files. Files are distributed to a process pool.
+
+A failure in one file doesn't stop the conversion of the others.
+Framing errors are skipped, decoding continues with the next block; other
+errors stop the conversion of the file and no output is written for it.
+
+Results are collected in a JSON manifest (OUTPUT_DIR/manifest.json by default)
+with the number of rows, blocks, framing errors and the schema of each file."""
+
+from __future__ import annotations
+
+from . import convert
+from . import decoder
+from . import decoder_utils
+from . import framing
+
+import argparse
+import concurrent.futures
+import dataclasses
+import fnmatch
+import itertools
+import json
+import os
+import shutil
+import sys
+from typing import Optional
+
+manifest_version = 1
+
+# Files sent to a worker process at once, amortizes the inter process
+# communication for small files.
+_files_per_task = 16
+
+
+@dataclasses.dataclass
+class FileResult:
+    path: str  # Relative to the input directory
+    output: Optional[str] = None  # Relative to the output directory
+    rows: int = 0
+    blocks: int = 0
+    framing_errors: list[str] = dataclasses.field(default_factory=list)  # Skipped
+    field_names: Optional[list[str]] = None
+    field_types: Optional[list[str]] = None
+    error: Optional[str] = None  # Exception that stopped the conversion
+
+
+def convert_directory(
+    input_dir,
+    output_dir,
+    format="csv",
+    pattern="*.tablog",
+    workers=None,
+    columns=None,
+    scale=None,
+    types=False,
+) -> list[FileResult]:
+    """Convert all files matching pattern in input_dir and its subdirectories.
+    format is either "csv" or "npy", columns, scale and types have the same
+    meaning as in module `convert`.
+    workers is the number of processes used, defaults to the number of CPUs.
+    Returns results of all files, ordered by path."""
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    paths = sorted(_find_files(input_dir, pattern))
+    args = (
+        itertools.repeat(input_dir),
+        paths,
+        itertools.repeat(output_dir),
+        itertools.repeat(format),
+        itertools.repeat(columns),
+        itertools.repeat(scale),
+        itertools.repeat(types),
+    )
+
+    if workers == 1 or len(paths) <= 1:
+        return list(map(_convert_file, *args))
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(_convert_file, *args, chunksize=_files_per_task))
+
+
+def write_manifest(path, results: list[FileResult]):
+    """Write results of convert_directory to a JSON file, with totals."""
+    content = {
+        "version": manifest_version,
+        "files": len(results),
+        "failed": sum(1 for r in results if r.error is not None),
+        "rows": sum(r.rows for r in results),
+        "results": [dataclasses.asdict(r) for r in results],
+    }
+    with open(path, "w") as fp:
+        json.dump(content, fp, indent=2)
+
+
+def _find_files(input_dir, pattern):
+    """Yield paths relative to input_dir of all files matching pattern"""
+    for dirpath, dirnames, filenames in os.walk(input_dir):
+        for filename in fnmatch.filter(filenames, pattern):
+            yield os.path.relpath(os.path.join(dirpath, filename), input_dir)
+
+
+def _output_path(path, format):
+    base = os.path.splitext(path)[0]
+    return base + ".csv" if format == "csv" else base
+
+
+def _convert_file(input_dir, path, output_dir, format, columns, scale, types):
+    """Convert a single file, return its FileResult. Never raises."""
+    result = FileResult(path)
+    output = _output_path(path, format)
+    output_path = os.path.join(output_dir, output)
+    tmp_path = output_path + ".tmp"
+
+    try:
+        file_decoder = _CountingDecoder(
+            decoder_utils.map_file(os.path.join(input_dir, path)), columns, result
+        )
+        result.field_names = [
+            n.decode("utf-8", "replace") for n in file_decoder.field_names
+        ]
+        result.field_types = [str(t) for t in file_decoder.field_types]
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        if format == "csv":
+            with open(
+                tmp_path, "w", newline="", buffering=convert._output_buffer_size
+            ) as fp:
+                convert.write_csv(file_decoder, fp, scale, types)
+        else:
+            convert.write_npy(file_decoder, tmp_path, scale)
+            if os.path.isdir(output_path):
+                shutil.rmtree(output_path)
+        os.replace(tmp_path, output_path)
+        result.output = output
+    except Exception as e:  # Any failure only gets reported in the result
+        result.error = f"{type(e).__name__}: {e}"
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return result
+
+
+class _CountingDecoder(decoder.TablogDecoder):
+    """TablogDecoder that skips framing errors and counts blocks and rows
+    into a FileResult"""
+
+    def __init__(self, chunks, columns, result):
+        self._result = result
+        super().__init__(chunks, columns)
+
+    def _next_block(self):
+        while True:
+            try:
+                if not super()._next_block():
+                    return False
+            except framing.FramingError as e:
+                self._result.framing_errors.append(f"{type(e).__name__}: {e}")
+                continue
+            self._result.blocks += 1
+            return True
+
+    def _read_arrays(self, max_rows):
+        columns = super()._read_arrays(max_rows)
+        self._result.rows += len(columns[0])
+        return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m decoder.batch",
+        description="Convert all Tablog files in a directory tree to CSV or NPY.",
+    )
+    parser.add_argument("input", help="Input directory")
+    parser.add_argument("output", help="Output directory")
+    parser.add_argument("--format", choices=["csv", "npy"], default="csv")
+    parser.add_argument(
+        "--pattern", default="*.tablog", help="Glob of input file names"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Number of processes, defaults to number of CPUs"
+    )
+    parser.add_argument("--columns", help="Comma separated names of fields to output")
+    parser.add_argument(
+        "--scale",
+        action="append",
+        default=[],
+        metavar="NAME=MULTIPLIER",
+        help="Divide values of the field by multiplier",
+    )
+    parser.add_argument(
+        "--types", action="store_true", help="Write field types as second CSV line"
+    )
+    parser.add_argument(
+        "--manifest", help="Manifest path, defaults to OUTPUT/manifest.json"
+    )
+    args = parser.parse_args(argv)
+
+    columns = args.columns.split(",") if args.columns is not None else None
+    try:
+        scale = convert._parse_scale(args.scale)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = convert_directory(
+        args.input,
+        args.output,
+        args.format,
+        args.pattern,
+        args.workers,
+        columns,
+        scale,
+        args.types,
+    )
+
+    manifest = args.manifest
+    if manifest is None:
+        manifest = os.path.join(args.output, "manifest.json")
+    os.makedirs(os.path.dirname(manifest) or ".", exist_ok=True)
+    write_manifest(manifest, results)
+
+    failed = [r for r in results if r.error is not None]
+    for r in failed:
+        print(f"{r.path}: {r.error}", file=sys.stderr)
+    print(
+        f"{len(results) - len(failed)} of {len(results)} files converted, "
+        f"{sum(r.rows for r in results)} rows"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
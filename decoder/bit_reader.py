@@ -1,6 +1,11 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
+from typing import Union
+import mmap
+
+# Types of contiguous input buffers that get read using word sized refills.
+buffer_types = (bytes, bytearray, memoryview, mmap.mmap)
 
 
 class IncompleteRead(Exception):
@@ -16,16 +21,50 @@ class IncompleteRead(Exception):
 
 
 class BitReader:
-    """Class that allows reading unaligned bit data from byte stream."""
-
-    def __init__(self, data: Iterable[int]):
+    """Class that allows reading unaligned bit data from byte stream.
+
+    Contiguous buffers (bytes, bytearray, memoryview, mmap) are read a whole word
+    at a time, any other iterable of ints is consumed byte by byte.
+    If chunked is True, data is an iterable of contiguous buffers, each of them
+    read word by word (used for blocks whose data are still being received).
+
+    If end_mark is False, the data is not expected to be terminated by the end
+    of block mark and all of its bits are readable (used for decoding blocks
+    that were not received completely yet)."""
+
+    _word_size = 8  # Number of bytes loaded at once from contiguous buffers
+    _max_bulk_bits = 512  # Largest single read done by read_many
+
+    def __init__(
+        self,
+        data: Union[Iterable[int], bytes, bytearray, memoryview],
+        end_mark: bool = True,
+        chunked: bool = False,
+    ):
         # `bytes` is a valid (and expected/intended) type for `data`
 
         self._remaining = 0
         self._bufer = 0
-        self._it = iter(data)
-        self._next_byte()
-        self._next_byte()
+        self._pos = 0  # Number of bytes loaded from the input
+        self._end_mark = end_mark
+        self._end_bits = 0  # Number of bits of the end mark and padding
+
+        if isinstance(data, buffer_types):
+            self._data = memoryview(data).cast("B")
+            self._refill = self._next_word
+        elif chunked:
+            self._chunks = iter(data)
+            self._data = memoryview(b"")
+            self._chunk_pos = 0  # Position in the current chunk
+            self._refill = self._next_chunk_word
+        else:
+            self._it = iter(data)
+            self._refill = self._next_byte
+
+        # Fill the lookahead, so that end_of_block works before the first read
+        while self._remaining < 9:
+            if not self._refill():
+                break
 
     def read(self, nbits) -> int:
         """Read n bits from the input, return as an int.
@@ -35,7 +74,7 @@ class BitReader:
         # Using 9 bits lookahead, so that we always have at least two next bytes
         # loaded and can reliably detect end of block mark
         while self._remaining < nbits + 9:
-            if not self._next_byte():
+            if not self._refill():
                 # Don't try to read more if the input has ended
                 break
 
@@ -52,21 +91,128 @@ class BitReader:
     def read_bit(self):
         return self.read(1)
 
+    def peek(self, nbits) -> tuple[int, int]:
+        """Return up to nbits of the following input without consuming them.
+        Returns tuple of the bits (as an int) and their count, which can be lower
+        than nbits near the end of the block."""
+        while self._remaining < nbits + 9:
+            if not self._refill():
+                break
+
+        available = max(0, min(nbits, self._remaining))
+        return (self._bufer & ((1 << available) - 1), available)
+
+    def fill(self, nbits):
+        """Load input data until there are at least nbits bits available or
+        the input ends. Reads don't need this, it is meant for code that reads
+        the bits directly from `_bufer` and `_remaining`."""
+        if self._remaining >= nbits:
+            return
+        if self._refill == self._next_word:
+            # Loading everything at once instead of word by word
+            pos = self._pos
+            size = (nbits - self._remaining + 7) // 8
+            chunk = self._data[pos : pos + size]
+            self._pos = pos + len(chunk)
+            self._bufer |= int.from_bytes(chunk, "little") << self._remaining
+            self._remaining += 8 * len(chunk)
+            if len(chunk) < size:
+                self._strip_end_mark()
+        elif self._refill == self._next_chunk_word:
+            while self._remaining < nbits:
+                if not self._next_chunk_word((nbits - self._remaining + 7) // 8):
+                    break
+        else:
+            while self._remaining < nbits:
+                if not self._refill():
+                    break
+
+    def read_many(self, nbits, count) -> list[int]:
+        """Read `count` values, `nbits` bits each, return them as a list.
+        Gives the same result as calling `read(nbits)` `count` times, but the
+        values are loaded from the buffer in larger groups."""
+
+        if nbits == 0:
+            return [self.read(0) for _ in range(count)]
+
+        mask = (1 << nbits) - 1
+        group_size = max(1, self._max_bulk_bits // nbits)
+        ret = []
+
+        while count > 0:
+            n = min(count, group_size)
+            try:
+                v = self.read(n * nbits)
+            except IncompleteRead:
+                # Not enough data for the whole group, fall back to single reads
+                # so that the values and the exception raised match what
+                # the individual reads would do.
+                for _ in range(n):
+                    ret.append(self.read(nbits))
+                raise
+
+            ret.extend((v >> shift) & mask for shift in range(0, n * nbits, nbits))
+            count -= n
+
+        return ret
+
     def _next_byte(self):
         try:
             b = next(self._it)
         except StopIteration:
-            # Detect the end flag (single 1 bit followed by 0 bytes) and remove
-            # from read data
-            self._remaining = self._bufer.bit_length() - 1
+            self._strip_end_mark()
             return False
         else:
             bits = 8
             assert 0 <= b < (1 << bits)
+            self._pos += 1
             self._bufer = self._bufer | b << self._remaining
             self._remaining += bits
             return True
 
+    def _next_word(self):
+        pos = self._pos
+        word = self._data[pos : pos + self._word_size]
+        if not word:
+            self._strip_end_mark()
+            return False
+
+        self._pos = pos + len(word)
+        self._bufer = self._bufer | int.from_bytes(word, "little") << self._remaining
+        self._remaining += 8 * len(word)
+        return True
+
+    def _next_chunk_word(self, size=_word_size):
+        """Load up to size bytes from the current chunk, moving to the next
+        chunk if it is exhausted"""
+        while self._chunk_pos >= len(self._data):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._strip_end_mark()
+                return False
+            self._data = memoryview(chunk).cast("B")
+            self._chunk_pos = 0
+
+        pos = self._chunk_pos
+        word = self._data[pos : pos + size]
+        self._chunk_pos = pos + len(word)
+        self._pos += len(word)
+        self._bufer = self._bufer | int.from_bytes(word, "little") << self._remaining
+        self._remaining += 8 * len(word)
+        return True
+
+    def _strip_end_mark(self):
+        """Detect the end flag (single 1 bit followed by 0 bytes) and remove
+        it from read data"""
+        if self._end_mark:
+            remaining = self._bufer.bit_length() - 1
+            self._end_bits += self._remaining - remaining
+            self._remaining = remaining
+
+    def position(self) -> int:
+        """Return number of bits read so far."""
+        return 8 * self._pos - self._remaining - self._end_bits
+
     def end_of_block(self):
         """Returns True if next read would raise IncompleteRead."""
         return self._remaining == 0
@@ -0,0 +1,243 @@
+"""Conversion of encoded files to CSV or to .npy files, one per column.
+
+Usage:
+    python -m decoder csv [INPUT] [-o OUTPUT] [--columns NAME,...]
+        [--scale NAME=MULTIPLIER ...] [--types]
+    python -m decoder npy [INPUT] -o DIRECTORY [--columns NAME,...]
+        [--scale NAME=MULTIPLIER ...]
+
+INPUT is an encoded file, standard input is read if it is missing or "-".
+Files are memory mapped, standard input is decoded chunk by chunk as it arrives
+(also within a block), data are decoded in batches of rows, so memory use
+doesn't depend on the input size.
+
+--scale divides values of the field by the multiplier, reversing the fixed
+point conversion of float CSV values (`f1000(u16)` type in datasets).
+With --types, CSV output has a second header line with the field types in
+the same format, making the output readable by datasets and the CSV encoder."""
+
+from __future__ import annotations
+
+from . import decoder
+from . import decoder_utils
+from . import exceptions
+
+import argparse
+import array
+import os
+import re
+import sys
+
+_batch_rows = 65536  # Rows decoded and written at once
+_output_buffer_size = 1 << 20
+_input_chunk_size = 1 << 16  # Bytes read from standard input at once
+_npy_header_size = 128  # Fixed, so that the header can be rewritten in place
+
+
+def write_csv(tablog_decoder, fp, scale=None, types=False):
+    """Write the remaining rows of tablog_decoder to text file fp as CSV.
+    scale: Dict mapping field names (bytes) to multipliers, values of these
+        fields are written divided by the multiplier.
+    types: Write the field types as a second header line.
+    Returns number of rows written."""
+    multipliers = _multipliers(tablog_decoder, scale)
+    fp.write(",".join(n.decode("utf-8") for n in tablog_decoder.field_names) + "\n")
+    if types:
+        fp.write(
+            ",".join(
+                str(t) if m is None else f"f{m}({t})"
+                for t, m in zip(tablog_decoder.field_types, multipliers)
+            )
+            + "\n"
+        )
+
+    formatters = [str if m is None else _fixed_point_formatter(m) for m in multipliers]
+    rows = 0
+    while True:
+        columns = tablog_decoder._read_arrays(_batch_rows)
+        if not columns[0]:
+            return rows
+        text_columns = [list(map(f, c)) for f, c in zip(formatters, columns)]
+        fp.write("\n".join(map(",".join, zip(*text_columns))))
+        fp.write("\n")
+        rows += len(columns[0])
+
+
+def write_npy(tablog_decoder, directory, scale=None):
+    """Write the remaining rows of tablog_decoder to directory, one .npy file
+    per field. Values of scaled fields (see write_csv) are stored as float64.
+    Doesn't require numpy.
+    Returns list of paths of the written files."""
+    multipliers = _multipliers(tablog_decoder, scale)
+    os.makedirs(directory, exist_ok=True)
+
+    paths = [
+        os.path.join(directory, _file_name(name) + ".npy")
+        for name in tablog_decoder.field_names
+    ]
+    if len(set(paths)) != len(paths):
+        raise exceptions.TablogError("Field names map to the same file name")
+
+    descrs = [_npy_type(t, m) for t, m in zip(tablog_decoder.field_types, multipliers)]
+    files = [open(path, "wb", buffering=_output_buffer_size) for path in paths]
+    try:
+        for fp, descr in zip(files, descrs):
+            _write_npy_header(fp, descr, 0)
+
+        rows = 0
+        while True:
+            columns = tablog_decoder._read_arrays(_batch_rows)
+            if not columns[0]:
+                break
+            for fp, column, m in zip(files, columns, multipliers):
+                if m is not None:
+                    column = array.array("d", [v / m for v in column])
+                fp.write(column.tobytes())
+            rows += len(columns[0])
+
+        for fp, descr in zip(files, descrs):
+            fp.seek(0)
+            _write_npy_header(fp, descr, rows)
+    finally:
+        for fp in files:
+            fp.close()
+
+    return paths
+
+
+def _multipliers(tablog_decoder, scale):
+    """Return list of multipliers for the decoded fields, None for the
+    fields that are not scaled"""
+    scale = scale or {}
+    for name in scale:
+        decoder.TablogDecoder._field_index(tablog_decoder.field_names, name)
+    return [scale.get(name) for name in tablog_decoder.field_names]
+
+
+def _fixed_point_formatter(multiplier):
+    """Return function formatting integer value divided by multiplier.
+    Powers of ten are formatted exactly, with fixed number of decimals."""
+    decimals = len(str(multiplier)) - 1
+    if multiplier != 10**decimals:
+        return lambda v: repr(v / multiplier)
+    if decimals == 0:
+        return str
+
+    def formatter(v):
+        sign = "-" if v < 0 else ""
+        integer, fraction = divmod(abs(v), multiplier)
+        return f"{sign}{integer}.{fraction:0{decimals}d}"
+
+    return formatter
+
+
+def _file_name(name):
+    """Make a safe file name out of a field name"""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name.decode("utf-8", "replace"))
+
+
+def _npy_type(t, multiplier):
+    if multiplier is not None:
+        return _npy_descr("f", 8)
+    return _npy_descr("i" if t.signed else "u", t.bytesize())
+
+
+def _npy_descr(kind, size):
+    if size == 1:
+        return "|" + kind + "1"
+    return ("<" if sys.byteorder == "little" else ">") + kind + str(size)
+
+
+def _write_npy_header(fp, descr, length):
+    """Write header of a version 1.0 .npy file containing one dimensional
+    array, padded to fixed size."""
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({length},), }}"
+    prefix = b"\x93NUMPY\x01\x00" + (_npy_header_size - 10).to_bytes(2, "little")
+    fp.write(prefix + header.ljust(_npy_header_size - 11).encode("latin1") + b"\n")
+
+
+def _read_stdin():
+    stdin = sys.stdin.buffer
+    return iter(lambda: stdin.read(_input_chunk_size), b"")
+
+
+def _parse_scale(values):
+    scale = {}
+    for value in values:
+        name, sep, multiplier = value.rpartition("=")
+        if not sep or not multiplier.isdigit() or int(multiplier) < 1:
+            raise ValueError(f"Invalid scale {value!r}, expected NAME=MULTIPLIER")
+        scale[name.encode("utf-8")] = int(multiplier)
+    return scale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m decoder",
+        description="Convert an encoded Tablog file to CSV or NPY.",
+    )
+    subparsers = parser.add_subparsers(dest="format", required=True)
+
+    csv_parser = subparsers.add_parser("csv", help="Convert to CSV")
+    csv_parser.add_argument(
+        "-o", "--output", help="Output file, standard output by default"
+    )
+    csv_parser.add_argument(
+        "--types", action="store_true", help="Write field types as second line"
+    )
+
+    npy_parser = subparsers.add_parser("npy", help="Convert to .npy file per field")
+    npy_parser.add_argument("-o", "--output", required=True, help="Output directory")
+
+    for p in (csv_parser, npy_parser):
+        p.add_argument("input", nargs="?", default="-", help="Encoded file")
+        p.add_argument("--columns", help="Comma separated names of fields to output")
+        p.add_argument(
+            "--scale",
+            action="append",
+            default=[],
+            metavar="NAME=MULTIPLIER",
+            help="Divide values of the field by multiplier",
+        )
+
+    args = parser.parse_args(argv)
+
+    columns = args.columns.split(",") if args.columns is not None else None
+    try:
+        scale = _parse_scale(args.scale)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        decoder.TablogDecoder._column_names(columns)
+    except ValueError as e:  # Repeated or no columns
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.input == "-":
+            tablog_decoder = decoder.TablogDecoder(_read_stdin(), columns)
+        else:
+            tablog_decoder = decoder.TablogDecoder(
+                decoder_utils.map_file(args.input), columns
+            )
+
+        if args.format == "npy":
+            write_npy(tablog_decoder, args.output, scale)
+        elif args.output is None:
+            write_csv(tablog_decoder, sys.stdout, scale, args.types)
+        else:
+            with open(
+                args.output, "w", newline="", buffering=_output_buffer_size
+            ) as fp:
+                write_csv(tablog_decoder, fp, scale, args.types)
+    except exceptions.TablogError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output closed early (piped to head), don't fail again when Python
+        # flushes stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+    return 0
@@ -3,56 +3,60 @@ from __future__ import annotations
 from . import decoder_utils
 from . import bit_reader
 from . import framing
-from . import predictors
+from . import row_decoder
 from . import exceptions
 from . import string
+from . import stats as stats_module
 
 import collections.abc
+import bisect
+import array
+import os
+import time
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
 
-class TablogDecoder:
-    supported_version = 0  # Supported version of Tablog format
 
-    def __init__(self, chunks: collections.abc.Iterable[bytes]):
-        """Construct the decoder object, pass in the encoded data
-        (either as single block or iterable of chunks)
-        chunks: Iterable of bytes (or bytes) containing the compressed data.
-        """
+class _DecoderBase:
+    """Decoding of block headers and rows from self._bit_reader, shared by the
+    decoder classes."""
 
-        self._framing_it = framing.decode_framing(chunks)
-        self._bit_reader = None
-        self.field_names = None
-        self.field_types = None
-        self._predictors = None
-        self._error_decoders = None
+    supported_version = 0  # Supported version of Tablog format
+    _header_lookahead_bits = 1024  # Longest header that is kept for comparison
 
-        if not self._next_block():
-            raise exceptions.InputEmptyError("No data to decode");
+    def _read_checked_header(self):
+        """Read header of a new block, check that it matches the previous block.
 
-    def _next_block(self):
-        try:
-            item = next(self._framing_it)
-        except StopIteration:
-            return False
-
-        if isinstance(item, collections.abc.Iterator):
-            self._bit_reader = bit_reader.BitReader(item)
-        else:
-            assert isinstance(item, framing.FramingError)
-            raise item
+        Blocks usually repeat the same header, so raw bits of the last header
+        are kept and if the new one is identical, only the decoding state
+        gets reset."""
+        if self._header_bits is not None:
+            length, bits = self._header_bits
+            lookahead, available = self._bit_reader.peek(length)
+            if available == length and lookahead == bits:
+                self._bit_reader.read(length)
+                self._state = self._row_decoder.initial_state()
+                return
 
-        old_field_names = self.field_names
-        old_field_types = self.field_types
+        old_header = self._header
 
+        lookahead, available = self._bit_reader.peek(self._header_lookahead_bits)
+        start = self._bit_reader.position()
         self._read_header()
+        length = self._bit_reader.position() - start
+        if length <= available:
+            self._header_bits = (length, lookahead & ((1 << length) - 1))
+        else:
+            self._header_bits = None
 
-        if old_field_names is not None and old_field_names != self.field_names:
+        if old_header is not None and old_header[0] != self._header[0]:
             raise exceptions.TablogError("Field names have changed")
-        if old_field_types is not None and old_field_types != self.field_types:
+        if old_header is not None and old_header[1] != self._header[1]:
             raise exceptions.TablogError("Field types have changed")
 
-        return True
-
     def _read_header(self):
         version = decoder_utils.decode_elias_gamma(self._bit_reader)
         if version != self.supported_version:
@@ -62,48 +66,276 @@ class TablogDecoder:
 
         field_count = decoder_utils.decode_elias_gamma(self._bit_reader) + 1
 
-        self.field_names = []
-        self.field_types = []
-        self._predictors = []
-        self._error_decoders = []
+        field_names = []
+        field_types = []
         for i in range(field_count):
             name = string.decode_string(self._bit_reader)
-            self.field_names.append(name)
+            field_names.append(name)
 
         for i in range(field_count):
-            value_type = decoder_utils.decode_type(self._bit_reader)
+            field_types.append(decoder_utils.decode_type(self._bit_reader))
 
-            predictor = predictors.Adapt(
-                value_type, 8, predictors.Last.factory(), predictors.LinearO2.factory()
-            )
-            error_decoder = decoder_utils.AdaptiveExpGolombDecoder(value_type.bitsize)
+        if self._columns is None:
+            columns = range(field_count)
+        else:
+            columns = [self._field_index(field_names, name) for name in self._columns]
+
+        # Only replacing the state once the whole header was read, so that
+        # an incomplete header leaves the decoder unchanged
+        self._header = (field_names, field_types)
+        self.field_names = [field_names[i] for i in columns]
+        self.field_types = [field_types[i] for i in columns]
+        self._row_decoder = row_decoder.get_row_decoder(
+            field_types, columns, instrumented=self.stats is not None
+        )
+        self._state = self._row_decoder.initial_state()
+        if self.stats is not None:
+            self.stats._set_header(field_names, field_types)
 
-            self.field_types.append(value_type)
-            self._predictors.append(predictor)
-            self._error_decoders.append(error_decoder)
+    @staticmethod
+    def _field_index(field_names, name):
+        try:
+            return field_names.index(name)
+        except ValueError:
+            raise exceptions.TablogError(
+                f"Column {name.decode('utf-8', 'replace')!r} not found"
+            ) from None
+
+    @staticmethod
+    def _column_names(columns):
+        """Convert the columns parameter to list of field names as bytes"""
+        if columns is None:
+            return None
+        names = [c.encode("utf-8") if isinstance(c, str) else bytes(c) for c in columns]
+        if not names:
+            raise ValueError("At least one column must be selected")
+        if len(set(names)) != len(names):
+            raise ValueError("Columns must not repeat")
+        return names
+
+    def _read_row(self):
+        return self._row_decoder.decode_row(self._bit_reader, self._state)
+
+    def _read_row_counted(self):
+        """Replaces _read_row when collecting statistics"""
+        row = self._row_decoder.decode_row(
+            self._bit_reader, self._state, self.stats.columns
+        )
+        self.stats.rows += 1
+        return row
+
+
+class TablogDecoder(_DecoderBase):
+    _residual_batch_size = 4096  # Max rows of residuals kept when reading columns
+    _follow_chunk_size = 65536  # Max bytes read at once when following a file
 
-    def _read_value_error(self, error_decoder):
-        hit = self._bit_reader.read_bit()
+    def __init__(
+        self, chunks: collections.abc.Iterable[bytes], columns=None, stats=False
+    ):
+        """Construct the decoder object, pass in the encoded data
+        (either as single block or iterable of chunks)
+        chunks: Iterable of bytes (or bytes) containing the compressed data.
+        columns: Names of the fields to decode (str or bytes), in the order they
+            should be output. All fields are decoded if None.
+            Bits of the other fields still need to be parsed, but their values
+            are not reconstructed.
+        stats: Collect decoding statistics in the `stats` attribute
+            (stats.DecoderStats), otherwise the attribute is None.
+            Decoding with statistics is slower.
 
-        if hit:
-            return 0
+        Contiguous buffers are split to blocks at once, from other iterables
+        rows get decoded as soon as their chunks arrive, without waiting for
+        the end of their block.
+        """
+
+        if isinstance(chunks, bit_reader.buffer_types):
+            self._framing_it = framing.decode_framing_blocks(chunks)
+        else:
+            self._framing_it = framing.decode_framing_streamed(chunks)
+        self._columns = self._column_names(columns)
+        if stats:
+            self.stats = stats_module.DecoderStats()
+            self._read_row = self._read_row_counted
         else:
-            prediction_high = self._bit_reader.read_bit()
-            error = error_decoder.decode(self._bit_reader) + 1
+            self.stats = None
+        self._bit_reader = None
+        self.field_names = None
+        self.field_types = None
+        self._header = None  # Names and types of all fields in the last header
+        self._row_decoder = None
+        self._state = None
+        self._header_bits = None  # Length and value of the last block header
 
-            return error if prediction_high else -error
+        if not self._next_block():
+            raise exceptions.InputEmptyError("No data to decode");
 
-    def _read_value(self, predictor, error_decoder):
-        error = self._read_value_error(error_decoder)
-        value = predictor.predict() - error
-        predictor.feed(value)
-        return value
+    @classmethod
+    def open_at_block(cls, path, n, columns=None):
+        """Open an encoded file for decoding starting from block n.
+        Negative n counts blocks from the end of the file.
 
-    def _read_row(self):
-        return [
-            self._read_value(predictor, error_decoder)
-            for predictor, error_decoder in zip(self._predictors, self._error_decoders)
-        ]
+        Block positions come from a sidecar index file (see module `index`),
+        which gets created or updated if necessary."""
+
+        from . import index  # Avoiding circular import
+
+        block = index.update_index(path)[n]
+        return cls(decoder_utils.map_file(path)[block.offset :], columns)
+
+    @classmethod
+    def from_path(cls, path, columns=None):
+        """Open an encoded file for decoding.
+        The file is memory mapped and decoded without copying it to memory,
+        so memory use doesn't grow with the file size."""
+        return cls(decoder_utils.map_file(path), columns)
+
+    @classmethod
+    def range(cls, path, column, start, stop, columns=None):
+        """Yield rows of an encoded file whose value in column is in the
+        interval [start, stop).
+        Values of the column must be non-decreasing through the file (typically
+        a timestamp). Blocks containing the interval are found by binary search
+        over the first values of blocks, only these blocks are decoded.
+        If the file has a sidecar index (see module `index`), its zone maps
+        provide the first values, otherwise the blocks are found by scanning
+        the framing only and first rows of the probed blocks get decoded.
+        columns selects the fields to output, as in the constructor."""
+
+        from . import index  # Avoiding circular import
+
+        data = decoder_utils.map_file(path)
+        (column,) = cls._column_names([column])
+
+        if os.path.exists(index.index_path(path)):
+            blocks = [block for block in index.update_index(path) if block.rows]
+            spans = [(b.offset, b.offset + b.length) for b in blocks]
+            if not spans:
+                return
+            field_names = cls(data[spans[0][0] : spans[0][1]]).field_names
+            field = cls._field_index(field_names, column)
+            first_values = [block.minimums[field] for block in blocks]
+        else:
+            spans = index.block_spans(data)
+            if not spans:
+                return
+            field_names = cls(data[spans[0][0] : spans[0][1]]).field_names
+            cls._field_index(field_names, column)
+            first_values = _BlockFirstValues(cls, data, spans, column)
+
+        # The block before the first one starting at or after start may still
+        # contain the start value (values can repeat across block boundaries)
+        first = max(bisect.bisect_left(first_values, start) - 1, 0)
+        last = bisect.bisect_left(first_values, stop)
+        if first >= last:
+            return
+
+        output_names = cls._column_names(columns)
+        if output_names is None:
+            output_names = field_names
+        decoded_names = output_names
+        if column not in decoded_names:
+            decoded_names = output_names + [column]
+        key = decoded_names.index(column)
+        output_count = len(output_names)
+
+        range_decoder = cls(
+            (data[span_start:span_end] for span_start, span_end in spans[first:last]),
+            decoded_names,
+        )
+        for row in range_decoder:
+            value = row[key]
+            if value >= stop:
+                return
+            if value >= start:
+                yield row[:output_count]
+
+    @classmethod
+    def follow(
+        cls, path, columns=None, start_block=None, poll_interval=0.5, timeout=None
+    ):
+        """Yield rows of an encoded file that is being appended to, like
+        `tail -f`.
+        Only the newly appended bytes are read, rows are yielded as soon as
+        their data is complete, without waiting for the end of their block
+        (see TablogPushDecoder). When there is no new data, the file is
+        checked again every poll_interval seconds. If the file gets truncated
+        or replaced by a new one, following restarts from its beginning.
+
+        columns: Selects the fields to output, as in the constructor.
+        start_block: Block to start from, negative values count from the end
+            (as in open_at_block). The whole file is read if None.
+        timeout: Stop after this many seconds without new data, follow
+            forever if None."""
+
+        from . import index  # Avoiding circular import
+        from . import push_decoder
+
+        offset = 0
+        if start_block is not None:
+            offset = index.update_index(path)[start_block].offset
+
+        fp = open(path, "rb")
+        try:
+            fp.seek(offset)
+            follow_decoder = push_decoder.TablogPushDecoder(columns)
+            last_data = time.monotonic()
+            while True:
+                data = fp.read(cls._follow_chunk_size)
+                if data:
+                    yield from follow_decoder.feed(data)
+                    last_data = time.monotonic()
+                    continue
+
+                if cls._follow_restart_needed(path, fp):
+                    fp.close()
+                    fp = open(path, "rb")
+                    follow_decoder = push_decoder.TablogPushDecoder(columns)
+                    continue
+
+                if timeout is not None and time.monotonic() - last_data >= timeout:
+                    return
+                time.sleep(poll_interval)
+        finally:
+            fp.close()
+
+    @staticmethod
+    def _follow_restart_needed(path, fp):
+        """Check if the followed file was truncated or replaced"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False  # Waiting for the replacement to appear
+        return st.st_ino != os.fstat(fp.fileno()).st_ino or st.st_size < fp.tell()
+
+    def _next_block(self):
+        try:
+            item = next(self._framing_it)
+        except StopIteration:
+            return False
+
+        if isinstance(item, framing.FramingError):
+            if self.stats is not None:
+                self.stats.framing_errors[type(item).__name__] += 1
+            raise item
+        if isinstance(item, framing.StreamedBlock):
+            if self.stats is not None:
+                self.stats.blocks += 1
+                item = self._counted_parts(item)
+            self._bit_reader = bit_reader.BitReader(item, chunked=True)
+        else:
+            if self.stats is not None:
+                self.stats.blocks += 1
+                self.stats.bytes += len(item)
+            self._bit_reader = bit_reader.BitReader(item)
+        self._read_checked_header()
+
+        return True
+
+    def _counted_parts(self, parts):
+        """Pass through parts of a streamed block, counting their bytes"""
+        for part in parts:
+            self.stats.bytes += len(part)
+            yield part
 
     def __iter__(self):
         while True:
@@ -111,3 +343,153 @@ class TablogDecoder:
                 yield self._read_row()
             if not self._next_block():
                 return
+
+    def read_columns(self, max_rows=None):
+        """Read the remaining rows (or at most max_rows of them) column-wise.
+        Returns list with one array per field, numpy arrays if numpy is available,
+        array.array otherwise. Array element types follow the field types."""
+        return self._convert_columns(self._read_arrays(max_rows))
+
+    def iter_column_batches(self, batch_size):
+        """Iterate over the remaining rows in column-wise batches of up to
+        batch_size rows. Batches are in the same format as read_columns returns."""
+        while True:
+            columns = self.read_columns(batch_size)
+            if len(columns[0]) == 0:
+                return
+            yield columns
+
+    def to_numpy(self, max_rows=None):
+        """Read the remaining rows (or at most max_rows of them) into a numpy
+        structured array, with fields named and typed according to the header.
+
+        Rows are decoded in batches directly into the result, which grows
+        as necessary, so there's no intermediate copy of the whole data."""
+        if numpy is None:
+            raise ImportError("to_numpy requires numpy")
+
+        dtype = numpy.dtype(
+            [
+                (name.decode("utf-8"), t.numpy_dtype())
+                for name, t in zip(self.field_names, self.field_types)
+            ]
+        )
+        ret = numpy.empty(self._residual_batch_size, dtype=dtype)
+        count = 0
+        while max_rows is None or count < max_rows:
+            batch_size = self._residual_batch_size
+            if max_rows is not None:
+                batch_size = min(batch_size, max_rows - count)
+            columns = self._read_arrays(batch_size)
+            n = len(columns[0])
+            if n == 0:
+                break
+
+            if count + n > len(ret):
+                ret.resize(max(2 * len(ret), count + n), refcheck=False)
+            for name, column in zip(dtype.names, columns):
+                ret[name][count : count + n] = numpy.frombuffer(
+                    column, dtype=column.typecode
+                )
+            count += n
+
+        ret.resize(count, refcheck=False)
+        return ret
+
+    def _read_arrays(self, max_rows):
+        """Same as read_columns, but always returns array.array columns"""
+        columns = [array.array(t.array_typecode()) for t in self.field_types]
+        self._read_rows_into(columns, max_rows)
+        return columns
+
+    def _read_rows_into(self, columns, max_rows):
+        """Decode up to max_rows rows (unlimited if None), append the values to
+        corresponding columns.
+        Decodes in two phases, first parsing the residuals of all rows from the
+        bit stream, then reconstructing the values column by column."""
+        if self.stats is not None:
+            return self._read_rows_into_counted(columns, max_rows)
+
+        residuals = [[] for _ in columns]
+        residual_appends = [r.append for r in residuals]
+        while max_rows is None or max_rows > 0:
+            if self._bit_reader.end_of_block():
+                if not self._next_block():
+                    return
+                continue
+
+            if max_rows is None:
+                batch = self._residual_batch_size
+            else:
+                batch = min(max_rows, self._residual_batch_size)
+
+            try:
+                count = self._row_decoder.decode_residuals(
+                    self._bit_reader, self._state, batch, residual_appends
+                )
+            finally:
+                # Reconstruct values also from the rows decoded before an error
+                for i, r, column in zip(self._row_decoder.columns, residuals, columns):
+                    self._row_decoder.reconstruct_column(
+                        self._state, i, r, column.append
+                    )
+                    r.clear()
+            if max_rows is not None:
+                max_rows -= count
+
+    def _read_rows_into_counted(self, columns, max_rows):
+        """Same as _read_rows_into, but collects statistics. Decodes complete
+        rows in one pass, because the statistics need the predictor state."""
+        appends = [column.append for column in columns]
+        while max_rows is None or max_rows > 0:
+            if self._bit_reader.end_of_block():
+                if not self._next_block():
+                    return
+                continue
+
+            count = self._row_decoder.decode_rows(
+                self._bit_reader, self._state, max_rows, appends, self.stats.columns
+            )
+            self.stats.rows += count
+            if max_rows is not None:
+                max_rows -= count
+
+    @staticmethod
+    def _convert_columns(columns):
+        if numpy is None:
+            return columns
+        else:
+            return [
+                numpy.frombuffer(column, dtype=column.typecode) for column in columns
+            ]
+
+
+class _BlockFirstValues(collections.abc.Sequence):
+    """Values of a column in the first rows of blocks, decoded on demand for
+    binary search. Empty blocks take the value of the next non-empty block
+    (or positive infinity), to keep the sequence sorted."""
+
+    def __init__(self, decoder_class, data, spans, column):
+        self._decoder_class = decoder_class
+        self._data = data
+        self._spans = spans
+        self._column = column
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __getitem__(self, i):
+        for j in range(i, len(self._spans)):
+            value = self._first_value(j)
+            if value is not None:
+                return value
+        return float("inf")
+
+    def _first_value(self, i):
+        if i not in self._cache:
+            start, end = self._spans[i]
+            block_decoder = self._decoder_class(self._data[start:end], [self._column])
+            row = next(iter(block_decoder), None)
+            self._cache[i] = row[0] if row is not None else None
+        return self._cache[i]
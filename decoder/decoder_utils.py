@@ -1,7 +1,29 @@
 from . import int_type
 
+import mmap
+import os
+
+# Number of bits that the variable length decoders look at when trying to decode
+# the whole value with a single read.
+_lookahead_bits = 64
+
 
 def decode_elias_gamma(bit_reader):
+    lookahead, available = bit_reader.peek(_lookahead_bits)
+    if lookahead:
+        # Number of zero bits before the first one (trailing zeros, because the
+        # stream is read from the least significant bit)
+        bits = (lookahead & -lookahead).bit_length() - 1
+        length = 2 * bits + 1
+        if length <= available:
+            return (1 << bits | bit_reader.read(length) >> (bits + 1)) - 1
+
+    return _decode_elias_gamma_slow(bit_reader)
+
+
+def _decode_elias_gamma_slow(bit_reader):
+    """Bit by bit Elias gamma decoding, used when the whole encoded value is not
+    available in the lookahead."""
     bits = 0
     while bit_reader.read_bit() == 0:
         bits += 1
@@ -17,17 +39,51 @@ class AdaptiveExpGolombDecoder:
 
     def decode(self, bit_reader):
         k = self._state >> self._state_shift
-        p = decode_elias_gamma(bit_reader)
 
+        lookahead, available = bit_reader.peek(k + _lookahead_bits)
+        if lookahead:
+            # Fast path: Elias gamma coded quotient and the remainder are read
+            # together
+            bits = (lookahead & -lookahead).bit_length() - 1
+            length = 2 * bits + 1 + k
+            if length <= available:
+                v = bit_reader.read(length)
+                p = (1 << bits | (v >> (bits + 1)) & ((1 << bits) - 1)) - 1
+                self._update_state(p)
+                return p << k | v >> (2 * bits + 1)
+
+        p = _decode_elias_gamma_slow(bit_reader)
+        self._update_state(p)
+        return p << k | bit_reader.read(k)
+
+    def _update_state(self, p):
         if p == 0 and self._state > 0:
             self._state -= 1
         elif p > 1 and self._state < self._max_state:
             self._state += 1
 
-        return p << k | bit_reader.read(k)
-
 
 def decode_type(bit_reader):
     signed = bool(bit_reader.read_bit())
     size = 8 << bit_reader.read(2)
     return int_type.IntType(signed, size)
+
+
+def map_file(path, length=0):
+    """Memory map a file for reading, return a memoryview of its content.
+    Maps the whole file unless the length is given.
+
+    The mapping is not closed explicitly, it gets unmapped once all views of it
+    are released."""
+    with open(path, "rb") as fp:
+        if length == 0 and os.fstat(fp.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return memoryview(b"")
+
+        mm = mmap.mmap(fp.fileno(), length, access=mmap.ACCESS_READ)
+
+    if hasattr(mm, "madvise"):  # Not available on Windows
+        # Pages can be dropped soon after they were decoded
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+
+    return memoryview(mm)
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 from . import exceptions
+from .bit_reader import buffer_types
 
 from collections.abc import Iterable
 from typing import Union, Literal
+import collections
 import itertools
+import re
 
 block_start_marker = object()
 block_end_marker = object()
 
+_escape_byte = b"T"[0]
+_start_byte = b"l"[0]
+_double_escape_byte = b" "[0]
+
+# Escape sequences that have a special meaning, everything else is just data.
+# This also handles escape bytes repeated before the sequence, because the
+# pattern never matches a sequence ending with the escape byte.
+_escape_sequence_re = re.compile(rb"T[l# ]")
+
 
 def decode_framing_raw(
     data: Union[bytes, Iterable[bytes]]
@@ -20,8 +32,8 @@ def decode_framing_raw(
     end_byte = b"#"[0]
     double_escape_byte = b" "[0]
 
-    if isinstance(data, bytes):
-        it = iter(data)
+    if isinstance(data, buffer_types):
+        it = iter(memoryview(data).cast("B"))
     else:
         it = itertools.chain.from_iterable(data)
 
@@ -128,6 +140,269 @@ class FramingBlockIterator:
             return UnexpectedEndOfData()
 
 
+def decode_framing_blocks(
+    data: Union[bytes, Iterable[bytes]], with_offsets: bool = False
+) -> Iterable[Union[FramingError, bytes, tuple[int, int, bytes]]]:
+    """Same as decode_framing, but yields each block as a single contiguous
+    bytes-like object, instead of an iterator.
+
+    Works on whole buffers, so this is much faster than going through
+    decode_framing_raw. Accepts bytes, bytearray, memoryview or mmap, or an
+    iterable of chunks of these types.
+
+    If with_offsets is set, blocks are yielded as tuples (start, end, data),
+    where start and end are the offsets of the block in the input data,
+    including the start and end marks."""
+
+    decoder = FramingDecoder()
+    if isinstance(data, buffer_types):
+        it = decoder._process(data, True)
+    else:
+        it = itertools.chain(
+            itertools.chain.from_iterable(
+                decoder._process(chunk, False) for chunk in data
+            ),
+            decoder._process(b"", True),
+        )
+
+    if with_offsets:
+        return it
+    else:
+        return (_strip_offsets(item) for item in it)
+
+
+def decode_framing_streamed(
+    chunks: Iterable[bytes],
+) -> Iterable[Union[FramingError, StreamedBlock]]:
+    """Same as decode_framing_blocks, but for iterables of chunks, yields each
+    block as a StreamedBlock as soon as its first data arrive, instead of
+    waiting for the block to be complete.
+
+    Data of the following blocks and framing errors are only pulled from chunks
+    once the previous block gets consumed (or skipped)."""
+
+    source = _StreamedEvents(chunks)
+    while True:
+        event = source.next_event()
+        if event is None:
+            return
+        if isinstance(event, FramingError):
+            yield event
+            continue
+
+        block = StreamedBlock(source, event)
+        yield block
+        block._ensure_consumed()
+
+
+class StreamedBlock:
+    """Iterator over contiguous parts (bytes-like objects) of a single block,
+    in the order they are received. Parts are never empty."""
+
+    def __init__(self, source, first_event):
+        self._source = source
+        self._pending = first_event
+        self._ended = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            if self._pending is not None:
+                part, ended = self._pending
+                self._pending = None
+            elif self._ended:
+                raise StopIteration()
+            else:
+                # Events inside a block are always its data, errors only follow
+                # the end of the block.
+                part, ended = self._source.next_event()
+
+            self._ended = ended
+            if len(part):
+                return part
+
+    def _ensure_consumed(self):
+        """Skip the rest of the block data, unless the block has already been
+        consumed."""
+        for _ in self:
+            pass
+
+
+class _StreamedEvents:
+    """Reads chunks into a FramingDecoder, provides its output as a sequence
+    of FramingError instances and tuples (block data, bool whether this ends
+    the block)."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = FramingDecoder()
+        self._events = collections.deque()
+        self._finished = False
+
+    def next_event(self):
+        """Return the next event, or None if the input has ended."""
+        while not self._events:
+            if self._finished:
+                return None
+            self._read_chunk()
+        return self._events.popleft()
+
+    def _read_chunk(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._finished = True
+            items = self._decoder._process(b"", True)
+        else:
+            items = self._decoder._process(chunk, False)
+
+        for item in items:
+            if isinstance(item, FramingError):
+                self._events.append(item)
+            else:
+                self._events.append((item[2], True))
+
+        if not self._finished:
+            partial = self._decoder.take_partial_block()
+            if partial:
+                self._events.append((partial, False))
+
+
+def _strip_offsets(item):
+    if isinstance(item, FramingError):
+        return item
+    else:
+        return item[2]
+
+
+class FramingDecoder:
+    """Push style framing decoder.
+
+    Input data can be split into chunks at arbitrary positions, blocks and errors
+    get reported once the chunk that completes them is fed in.
+    Block data is only copied if the block spans several chunks or when escape
+    sequences need to be removed from it, otherwise it is a memoryview slice
+    of the input chunk."""
+
+    def __init__(self):
+        self._in_block = False
+        self._junk = 0  # Number of unexpected items before the next block
+        self._block_parts = []  # Block data from the current chunk
+        self._carry = bytearray()  # Block data from the previous chunks
+        self._held_escape = False  # The previous chunk ended with an escape byte
+        self._offset = 0  # Input offset of the first byte not processed yet
+        self._block_start = None  # Input offset of the current block start mark
+
+    def feed(self, data) -> list[Union[FramingError, bytes]]:
+        """Process a chunk of input, return list of the blocks and framing
+        errors that it completed."""
+        return [_strip_offsets(item) for item in self._process(data, False)]
+
+    def finish(self) -> list[Union[FramingError, bytes]]:
+        """Signal the end of input, return list of the remaining blocks and
+        framing errors."""
+        return [_strip_offsets(item) for item in self._process(b"", True)]
+
+    def take_partial_block(self) -> bytearray:
+        """Return data of the current unfinished block that were fed in so far
+        and drop them from the decoder, the block reported when it gets completed
+        then only contains the data fed in after this call.
+        Returns empty bytearray when not inside a block."""
+        block = self._carry
+        self._carry = bytearray()
+        return block
+
+    def _process(self, data, final):
+        """Process a chunk of data, yield FramingError instances and blocks as
+        tuples (start offset, end offset, data)."""
+        if self._held_escape:
+            data = b"T" + bytes(data)
+            self._held_escape = False
+
+        buf_offset = self._offset
+
+        buf = memoryview(data).cast("B")
+        end = len(buf)
+
+        if not final and end and buf[end - 1] == _escape_byte:
+            # Meaning of the escape depends on the next chunk, wait for it.
+            end -= 1
+            self._held_escape = True
+
+        pos = 0
+        for match in _escape_sequence_re.finditer(buf, 0, end):
+            start = match.start()
+            command = buf[start + 1]
+
+            if self._in_block:
+                if command == _double_escape_byte:
+                    self._block_parts.append(buf[pos : start + 1])
+                else:
+                    self._block_parts.append(buf[pos:start])
+                    if command == _start_byte:
+                        # Previous block got interrupted by a new one
+                        yield self._take_block(buf_offset + start)
+                        yield UnexpectedEndOfData()
+                        self._block_start = buf_offset + start
+                    else:
+                        yield self._take_block(buf_offset + match.end())
+                        self._in_block = False
+            else:
+                self._junk += start - pos
+                if command == _start_byte:
+                    if self._junk:
+                        yield UnexpectedCharacters(self._junk)
+                        self._junk = 0
+                    self._in_block = True
+                    self._block_start = buf_offset + start
+                else:
+                    # Unexpected end mark or a double escape
+                    self._junk += 1
+
+            pos = match.end()
+
+        if self._in_block:
+            self._block_parts.append(buf[pos:end])
+        else:
+            self._junk += end - pos
+
+        self._offset = buf_offset + end
+
+        if final:
+            if self._in_block:
+                yield self._take_block(self._offset)
+                yield UnexpectedEndOfData()
+                self._in_block = False
+            elif self._junk:
+                yield UnexpectedCharacters(self._junk)
+                self._junk = 0
+        else:
+            # The input chunk will not be available any more, copy the data
+            for part in self._block_parts:
+                self._carry += part
+            self._block_parts = []
+
+    def _take_block(self, end):
+        """Return tuple of the current block offsets and data, reset the stored
+        data."""
+        parts = self._block_parts
+        self._block_parts = []
+
+        if self._carry:
+            block = self._carry
+            for part in parts:
+                block += part
+            self._carry = bytearray()
+        elif len(parts) == 1:
+            block = parts[0]
+        else:
+            block = b"".join(parts)
+
+        return (self._block_start, end, block)
+
+
 class FramingError(exceptions.TablogError):
     def __str__(self):
         return "Unspecified framing error"
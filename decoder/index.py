@@ -0,0 +1,259 @@
+"""Sidecar index of block positions in encoded files.
+
+Every block is self contained (it repeats the complete header), so knowing
+where the blocks start allows decoding from any block without reading the file
+from the beginning.
+
+The index also keeps minimum and maximum of every column in each block (zone
+maps), these allow skipping blocks that cannot contain rows matching simple
+range predicates."""
+
+from __future__ import annotations
+
+from . import bit_reader
+from . import framing
+from . import decoder
+from . import decoder_utils
+from . import exceptions
+
+import dataclasses
+import json
+import operator
+import os
+from typing import Optional
+
+index_suffix = ".tlidx"
+index_version = 1
+
+
+@dataclasses.dataclass
+class BlockInfo:
+    offset: int  # Offset of the block start mark in the file
+    length: int  # Length of the block in bytes, including start and end marks
+    rows: int  # Number of rows in the block
+    # Minimum and maximum value of each field, empty if the block has no rows
+    minimums: list[int] = dataclasses.field(default_factory=list)
+    maximums: list[int] = dataclasses.field(default_factory=list)
+    # Why the block could not be decoded, such blocks are indexed with no rows
+    error: Optional[str] = None
+
+
+class IndexFileError(exceptions.TablogError):
+    pass
+
+
+def index_path(path) -> str:
+    """Return path of the index file belonging to an encoded file."""
+    return os.fspath(path) + index_suffix
+
+
+def build_index(data, offset: int = 0) -> list[BlockInfo]:
+    """Find all complete blocks in the encoded data and count their rows.
+    offset is added to the offsets of blocks found."""
+
+    return [_block_info(data, start, end, offset) for start, end in block_spans(data)]
+
+
+def block_spans(data) -> list[tuple[int, int]]:
+    """Return (start, end) offsets of all complete blocks in the encoded data.
+    Only scans the framing, the blocks are not decoded."""
+    spans = []
+    pending = None  # Block that is complete unless it's followed by end of data error
+    for item in framing.decode_framing_blocks(data, with_offsets=True):
+        if isinstance(item, framing.UnexpectedEndOfData):
+            pending = None
+            continue
+        if pending is not None:
+            spans.append(pending)
+            pending = None
+        if not isinstance(item, framing.FramingError):
+            pending = item[:2]
+
+    if pending is not None:
+        spans.append(pending)
+
+    return spans
+
+
+def _block_info(data, start, end, offset):
+    try:
+        block_decoder = decoder.TablogDecoder(memoryview(data)[start:end])
+        columns = block_decoder._read_arrays(None)
+    except (exceptions.TablogError, bit_reader.IncompleteRead) as e:
+        # A single damaged block must not make the whole file unindexable
+        return BlockInfo(
+            start + offset, end - start, 0, error=f"{type(e).__name__}: {e}"
+        )
+
+    rows = len(columns[0])
+    if rows:
+        return BlockInfo(
+            start + offset,
+            end - start,
+            rows,
+            [min(column) for column in columns],
+            [max(column) for column in columns],
+        )
+    else:
+        return BlockInfo(start + offset, end - start, rows)
+
+
+def write_index(path, blocks: list[BlockInfo], indexed_size: int):
+    """Write index of blocks of the encoded file at path.
+    indexed_size is the size of the file that the index describes."""
+    content = {
+        "version": index_version,
+        "indexed_size": indexed_size,
+        "blocks": [
+            [b.offset, b.length, b.rows, b.minimums, b.maximums]
+            + ([b.error] if b.error is not None else [])
+            for b in blocks
+        ],
+    }
+    tmp_path = index_path(path) + ".tmp"
+    with open(tmp_path, "w") as fp:
+        json.dump(content, fp, separators=(",", ":"))
+    os.replace(tmp_path, index_path(path))
+
+
+def read_index(path) -> tuple[list[BlockInfo], int]:
+    """Read index of the encoded file at path.
+    Returns list of blocks and size of the file covered by the index."""
+    with open(index_path(path), "r") as fp:
+        content = json.load(fp)
+
+    if content.get("version") != index_version:
+        raise IndexFileError(f"Unsupported index version {content.get('version')!r}")
+
+    return (
+        [BlockInfo(*block) for block in content["blocks"]],
+        content["indexed_size"],
+    )
+
+
+def update_index(path) -> list[BlockInfo]:
+    """Return index of blocks for the encoded file at path.
+
+    Reuses the sidecar index file if there is one, if the encoded file grew since
+    the index was written, only the data after the last indexed block are scanned.
+    Creates or updates the index file if necessary, if it cannot be written
+    (e.g. in a read-only directory), the index is only returned.
+    Blocks that fail to decode are indexed with no rows and their error."""
+
+    try:
+        blocks, indexed_size = read_index(path)
+    except (OSError, ValueError, KeyError, TypeError, IndexFileError):
+        blocks = []
+        indexed_size = -1  # Force writing the index even for empty files
+
+    size = os.path.getsize(path)
+    if size == indexed_size:
+        return blocks
+    if size < indexed_size:
+        # The file was truncated or replaced, index everything again
+        blocks = []
+
+    scan_start = blocks[-1].offset + blocks[-1].length if blocks else 0
+
+    if size > scan_start:
+        data = decoder_utils.map_file(path, size)
+        blocks.extend(build_index(data[scan_start:], scan_start))
+
+    try:
+        write_index(path, blocks, size)
+    except OSError:
+        pass
+    return blocks
+
+
+# Predicate operators: (row test, test if a block with given min and max can match)
+_operators = {
+    "<": (operator.lt, lambda lo, hi, v: lo < v),
+    "<=": (operator.le, lambda lo, hi, v: lo <= v),
+    ">": (operator.gt, lambda lo, hi, v: hi > v),
+    ">=": (operator.ge, lambda lo, hi, v: hi >= v),
+    "==": (operator.eq, lambda lo, hi, v: lo <= v <= hi),
+    "!=": (operator.ne, lambda lo, hi, v: lo != v or hi != v),
+}
+
+
+def matching_blocks(path, predicates) -> list[BlockInfo]:
+    """Return blocks of the encoded file at path that may contain rows matching
+    all predicates, based on the zone maps in the index (updated if necessary).
+
+    predicates is an iterable of tuples (column name, operator, value), where
+    operator is one of "<", "<=", ">", ">=", "==", "!=". Column names can be
+    str or bytes."""
+    blocks = update_index(path)
+    readable = [block for block in blocks if block.error is None]
+    if not readable:
+        return []
+
+    field_names = _read_field_names(path, readable[0])
+    checks = [
+        (
+            decoder.TablogDecoder._field_index(field_names, column),
+            _operators[op][1],
+            value,
+        )
+        for column, op, value in _parse_predicates(predicates)
+    ]
+
+    return [
+        block
+        for block in blocks
+        if block.rows
+        and all(
+            check(block.minimums[i], block.maximums[i], value)
+            for i, check, value in checks
+        )
+    ]
+
+
+def iter_filtered_rows(path, predicates, columns=None):
+    """Yield rows of the encoded file at path that match all predicates
+    (see matching_blocks), only decoding the blocks that may contain them.
+    columns selects the fields to output, same as in TablogDecoder."""
+    predicates = list(_parse_predicates(predicates))
+    blocks = matching_blocks(path, predicates)
+    if not blocks:
+        return
+
+    data = decoder_utils.map_file(path)
+    output_names = decoder.TablogDecoder._column_names(columns)
+    if output_names is None:
+        output_names = _read_field_names(path, blocks[0])
+    decoded_names = output_names + [
+        column
+        for column in dict.fromkeys(column for column, _, _ in predicates)
+        if column not in output_names
+    ]
+
+    block_decoder = decoder.TablogDecoder(
+        (data[b.offset : b.offset + b.length] for b in blocks), decoded_names
+    )
+    checks = [
+        (decoded_names.index(column), _operators[op][0], value)
+        for column, op, value in predicates
+    ]
+    output_count = len(output_names)
+
+    for row in block_decoder:
+        if all(test(row[i], value) for i, test, value in checks):
+            yield row[:output_count]
+
+
+def _parse_predicates(predicates):
+    """Validate the predicates, yield them with column names as bytes"""
+    for column, op, value in predicates:
+        if op not in _operators:
+            raise ValueError(f"Unknown predicate operator {op!r}")
+        (column,) = decoder.TablogDecoder._column_names([column])
+        yield column, op, value
+
+
+def _read_field_names(path, block):
+    data = decoder_utils.map_file(path)
+    return decoder.TablogDecoder(
+        data[block.offset : block.offset + block.length]
+    ).field_names
@@ -1,3 +1,6 @@
+import array
+
+
 class IntType:
     allowed_bitsizes = [8, 16, 32, 64]
 
@@ -17,6 +20,9 @@ class IntType:
     def __eq__(self, other):
         return self.signed == other.signed and self.bitsize == other.bitsize
 
+    def __hash__(self):
+        return hash((self.signed, self.bitsize))
+
     def min(self):
         if self.signed:
             return -(1 << (self.bitsize - 1))
@@ -54,6 +60,17 @@ class IntType:
     def bytesize(self):
         return self.bitsize // 8
 
+    def array_typecode(self):
+        """Return typecode of the `array` module corresponding to this type."""
+        return _array_typecodes[(self.signed, self.bitsize)]
+
+    def numpy_dtype(self):
+        """Return numpy dtype corresponding to this type.
+        Requires numpy to be installed."""
+        import numpy
+
+        return numpy.dtype(f"{'i' if self.signed else 'u'}{self.bytesize()}")
+
     @classmethod
     def from_string(cls, s):
         bitsize = int(s[1:])
@@ -72,3 +89,28 @@ class IntType:
             return v - unsigned_limit
         else:
             return v
+
+    def convert_unsigned_array(self, values):
+        """Vectorized version of convert_unsigned, converts numpy array (or
+        anything that numpy can convert to array) of values of the corresponding
+        unsigned type. Requires numpy to be installed."""
+        import numpy
+
+        unsigned = IntType(False, self.bitsize).numpy_dtype()
+        return numpy.asarray(values, dtype=unsigned).view(self.numpy_dtype())
+
+
+def _find_array_typecodes():
+    """Map (signed, bitsize) to array module typecodes.
+    Sizes of the C types behind the typecodes are platform dependent, so
+    this needs to be checked at runtime."""
+    ret = {}
+    # `l` goes first, so that `i` or `q` replace it if both have the same size.
+    for typecode in "lbhiq":
+        bitsize = 8 * array.array(typecode).itemsize
+        ret[(True, bitsize)] = typecode
+        ret[(False, bitsize)] = typecode.upper()
+    return ret
+
+
+_array_typecodes = _find_array_typecodes()
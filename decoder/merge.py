@@ -0,0 +1,78 @@
+"""Merging rows of multiple encoded files into a single sequence ordered by
+a column (typically a timestamp)."""
+
+from __future__ import annotations
+
+from . import decoder
+from . import exceptions
+
+import heapq
+
+_batch_rows = 1024  # Rows decoded at once from each file
+
+
+def merge_files(paths, column, columns=None):
+    """Yield (source index, row) tuples with rows of all files in paths, in
+    order of values of the given column. Source index is the position of the
+    row's file in paths, rows with equal values are ordered by it.
+
+    Values of the column must be non-decreasing within each file, otherwise
+    TablogError is raised once the decrease is reached.
+    columns selects the fields to output, as in TablogDecoder, the merge
+    column doesn't need to be among them. Files may have different fields
+    if all of them contain the selected ones. Empty files are skipped.
+
+    All files are opened up front. They are memory mapped and only a small
+    batch of rows is decoded from each of them at a time, so memory use
+    depends on the number of files, not their size."""
+
+    paths = list(paths)
+    (column,) = decoder.TablogDecoder._column_names([column])
+    output_names = decoder.TablogDecoder._column_names(columns)
+
+    heap = []
+    for i, path in enumerate(paths):
+        rows = _file_rows(path, column, output_names)
+        first = next(rows, None)
+        if first is not None:
+            heap.append((first[0], i, first[1], rows))
+    heapq.heapify(heap)
+
+    while heap:
+        key, i, row, rows = heap[0]
+        yield i, row
+
+        following = next(rows, None)
+        if following is None:
+            heapq.heappop(heap)
+        elif following[0] < key:
+            raise exceptions.TablogError(
+                f"Values of column {column.decode('utf-8', 'replace')!r} "
+                f"decrease in file {paths[i]}"
+            )
+        else:
+            heapq.heapreplace(heap, (following[0], i, following[1], rows))
+
+
+def _file_rows(path, column, output_names):
+    """Yield (value of column, row) for all rows of the file"""
+    try:
+        if output_names is None:
+            file_decoder = decoder.TablogDecoder.from_path(path)
+            output_count = len(file_decoder.field_names)
+            key = file_decoder._field_index(file_decoder.field_names, column)
+        else:
+            decoded_names = output_names
+            if column not in decoded_names:
+                decoded_names = output_names + [column]
+            file_decoder = decoder.TablogDecoder.from_path(path, decoded_names)
+            output_count = len(output_names)
+            key = decoded_names.index(column)
+    except exceptions.InputEmptyError:
+        return
+
+    while True:
+        columns = file_decoder._read_arrays(_batch_rows)
+        if not columns[0]:
+            return
+        yield from zip(columns[key], map(list, zip(*columns[:output_count])))
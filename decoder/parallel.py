@@ -0,0 +1,141 @@
+"""Decoding whole files using multiple processes.
+
+Blocks are self contained, so the file is split at block boundaries and groups
+of consecutive blocks are decoded in a process pool. Workers send back decoded
+columns as typed arrays, which pickle as compact binary data."""
+
+from __future__ import annotations
+
+from . import decoder
+from . import decoder_utils
+from . import exceptions
+from . import framing
+
+import array
+import concurrent.futures
+import itertools
+import os
+
+# Number of tasks per worker process, more tasks help balancing the load when
+# blocks decode at different speeds.
+_tasks_per_worker = 4
+
+
+def decode_file(path, workers=None, columns=None):
+    """Decode a whole file in parallel, return list of columns in the same
+    format as TablogDecoder.read_columns.
+    Unlike TablogDecoder, framing errors are raised before decoding any data.
+    workers is the number of processes used, defaults to the number of CPUs.
+    columns selects the fields to decode, same as in TablogDecoder."""
+
+    _, field_types, parts = _decode_parts(path, workers, columns)
+    columns = [array.array(t.array_typecode()) for t in field_types]
+    for part in parts:
+        for column, part_column in zip(columns, part):
+            column.extend(part_column)
+    return decoder.TablogDecoder._convert_columns(columns)
+
+
+def iter_rows(path, workers=None, columns=None):
+    """Decode a whole file in parallel, yield rows in the original order.
+    Rows are yielded as soon as all blocks before them are decoded."""
+    _, _, parts = _decode_parts(path, workers, columns)
+    for part in parts:
+        for row in zip(*part):
+            yield list(row)
+
+
+def _decode_parts(path, workers, columns):
+    """Split the file into tasks, start decoding them.
+    Returns field names, field types and iterable of the decoded column parts."""
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    tasks = _split_tasks(_block_spans(path), workers * _tasks_per_worker)
+    if not tasks:
+        raise exceptions.InputEmptyError("No data to decode")
+
+    starts, ends = zip(*tasks)
+    if workers == 1 or len(tasks) == 1:
+        results = map(
+            _decode_range,
+            itertools.repeat(path),
+            starts,
+            ends,
+            itertools.repeat(columns),
+        )
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+        results = _shutdown_after(
+            executor,
+            executor.map(
+                _decode_range,
+                itertools.repeat(path),
+                starts,
+                ends,
+                itertools.repeat(columns),
+            ),
+        )
+
+    field_names, field_types, first_part = next(results)
+
+    def parts():
+        yield first_part
+        for names, types, part in results:
+            if names != field_names:
+                raise exceptions.TablogError("Field names have changed")
+            if types != field_types:
+                raise exceptions.TablogError("Field types have changed")
+            yield part
+
+    return field_names, field_types, parts()
+
+
+def _shutdown_after(executor, it):
+    with executor:
+        yield from it
+
+
+def _block_spans(path):
+    """Return list of (start, end) offsets of all blocks in the file, raise the
+    first framing error found."""
+    spans = []
+    for item in framing.decode_framing_blocks(
+        decoder_utils.map_file(path), with_offsets=True
+    ):
+        if isinstance(item, framing.FramingError):
+            raise item
+        spans.append(item[:2])
+    return spans
+
+
+def _split_tasks(spans, task_count):
+    """Group consecutive blocks to at most task_count ranges of similar size.
+    Returns list of (start, end) offsets."""
+    if not spans:
+        return []
+
+    total_size = spans[-1][1] - spans[0][0]
+    task_size = total_size / task_count
+
+    tasks = []
+    task_start = spans[0][0]
+    for start, end in spans:
+        if end - task_start >= task_size:
+            tasks.append((task_start, end))
+            task_start = end
+    if task_start < spans[-1][1]:
+        tasks.append((task_start, spans[-1][1]))
+
+    return tasks
+
+
+def _decode_range(path, start, end, columns=None):
+    """Decode blocks between the two offsets in the file.
+    Returns field names, field types and list of array.array columns."""
+    block_decoder = decoder.TablogDecoder(
+        decoder_utils.map_file(path)[start:end], columns
+    )
+    columns = block_decoder._read_arrays(None)
+    return block_decoder.field_names, block_decoder.field_types, columns
@@ -0,0 +1,227 @@
+"""Attribution of decoding time to the phases of the decoding pipeline.
+
+Decoding goes through a chain of generators and generated code, so a plain
+cProfile run attributes most of the time to a few opaque functions.
+Here a whole file is decoded with timers around the individual phases:
+
+framing: Finding the blocks and removing escape sequences.
+bit reading: Loading bytes of the block into the bit buffer for row decoding
+    (bits read while decoding the header count as header time).
+header: Block header decoding, including the field name strings.
+entropy decoding: Parsing the prediction errors from the bit stream.
+reconstruction: Predictor evaluation, reconstructing values from the errors.
+other: Everything else (output conversion, the decoder loops).
+
+Time of each phase excludes the time of phases nested in it. The timers add
+some overhead, so the absolute numbers are slower than an uninstrumented run.
+
+Usage: python -m decoder.profiling FILE [--columns NAME,...] [--pstats OUTPUT]
+With --pstats, the decoding also runs under cProfile and the statistics are
+written to OUTPUT. The phases appear there as functions named phase_*."""
+
+from __future__ import annotations
+
+from . import decoder
+from . import decoder_utils
+
+import argparse
+import cProfile
+import dataclasses
+import pstats
+import sys
+import time
+import types
+from typing import Optional
+
+phases = (
+    "framing",
+    "bit reading",
+    "header",
+    "entropy decoding",
+    "reconstruction",
+    "other",
+)
+
+_batch_size = 65536  # Rows per batch when decoding the file
+
+
+class PhaseTimer:
+    """Accumulates wall time spent in nested phases, time of inner phases is
+    not counted in the outer ones."""
+
+    def __init__(self):
+        self.times = dict.fromkeys(phases, 0.0)
+        self._stack = ["other"]
+        self._last = time.perf_counter()
+
+    def enter(self, phase):
+        self._switch()
+        self._stack.append(phase)
+
+    def exit(self):
+        self._switch()
+        self._stack.pop()
+
+    def wrap(self, phase, function):
+        """Return function wrapped to run in the given phase.
+        The wrapper is named phase_<name of the phase> to make it recognizable
+        in cProfile output."""
+
+        def wrapper(*args, **kwargs):
+            self.enter(phase)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.exit()
+
+        name = "phase_" + phase.replace(" ", "_")
+        return types.FunctionType(
+            wrapper.__code__.replace(co_name=name),
+            wrapper.__globals__,
+            name,
+            wrapper.__defaults__,
+            wrapper.__closure__,
+        )
+
+    def _switch(self):
+        now = time.perf_counter()
+        self.times[self._stack[-1]] += now - self._last
+        self._last = now
+
+
+@dataclasses.dataclass
+class ProfileResult:
+    times: dict[str, float]  # Time spent in each phase, in seconds
+    total: float  # Wall time of the whole decoding, in seconds
+    rows: int  # Number of rows decoded
+    blocks: int  # Number of blocks decoded
+    stats: Optional[pstats.Stats] = None  # cProfile statistics, if requested
+
+    def report(self) -> str:
+        """Return human readable table of the phase times."""
+        lines = [f"{'phase':<20}{'time [s]':>10}{'%':>8}"]
+        for phase, t in self.times.items():
+            lines.append(f"{phase:<20}{t:>10.3f}{self._percent(t):>8.1f}")
+        lines.append(
+            f"{'total':<20}{self.total:>10.3f}{self._percent(self.total):>8.1f}"
+        )
+        lines.append(f"{self.rows} rows in {self.blocks} blocks")
+        return "\n".join(lines)
+
+    def _percent(self, t):
+        return 100 * t / self.total if self.total else 0.0
+
+
+def profile_file(path, columns=None, cprofile=False) -> ProfileResult:
+    """Decode the whole encoded file at path, measuring time of the decoding phases.
+    columns selects the fields to decode, same as in TablogDecoder.
+    If cprofile is set, the decoding also runs under cProfile."""
+    profiler = cProfile.Profile() if cprofile else None
+
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        profiling_decoder = _ProfilingDecoder(
+            decoder_utils.map_file(path), timer, columns
+        )
+        rows = 0
+        for batch in profiling_decoder.iter_column_batches(_batch_size):
+            rows += len(batch[0])
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    timer._switch()
+    total = time.perf_counter() - start
+
+    return ProfileResult(
+        timer.times,
+        total,
+        rows,
+        profiling_decoder._blocks,
+        pstats.Stats(profiler) if profiler is not None else None,
+    )
+
+
+class _ProfilingDecoder(decoder.TablogDecoder):
+    """TablogDecoder with the phases wrapped in timers"""
+
+    def __init__(self, chunks, timer, columns):
+        self._timer = timer
+        self._blocks = 0
+        super().__init__(chunks, columns)
+
+    def _next_block(self):
+        if not isinstance(self._framing_it, _TimedIterator):
+            self._framing_it = _TimedIterator(self._framing_it, self._timer)
+        return super()._next_block()
+
+    def _read_checked_header(self):
+        self._blocks += 1
+        bit_reader = self._bit_reader
+        bit_reader.fill = self._timer.wrap("bit reading", bit_reader.fill)
+
+        self._timer.enter("header")
+        try:
+            super()._read_checked_header()
+        finally:
+            self._timer.exit()
+
+    def _read_header(self):
+        super()._read_header()
+        self._row_decoder = _TimedRowDecoder(self._row_decoder, self._timer)
+
+
+class _TimedIterator:
+    def __init__(self, it, timer):
+        self._next = timer.wrap("framing", it.__next__)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._next()
+
+
+class _TimedRowDecoder:
+    """Row decoder proxy that times the two decoding phases"""
+
+    def __init__(self, row_decoder, timer):
+        self.columns = row_decoder.columns
+        self.initial_state = row_decoder.initial_state
+        self.decode_row = row_decoder.decode_row
+        self.decode_residuals = timer.wrap(
+            "entropy decoding", row_decoder.decode_residuals
+        )
+        self.reconstruct_column = timer.wrap(
+            "reconstruction", row_decoder.reconstruct_column
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m decoder.profiling",
+        description="Decode a Tablog file, report time spent in the decoding phases.",
+    )
+    parser.add_argument("file", help="Encoded file")
+    parser.add_argument(
+        "--columns", help="Comma separated names of the fields to decode"
+    )
+    parser.add_argument(
+        "--pstats", metavar="OUTPUT", help="Run cProfile, write the statistics here"
+    )
+    args = parser.parse_args(argv)
+
+    columns = args.columns.split(",") if args.columns is not None else None
+    result = profile_file(args.file, columns, cprofile=args.pstats is not None)
+
+    print(result.report())
+    if result.stats is not None:
+        result.stats.dump_stats(args.pstats)
+        print()
+        result.stats.sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Sans-IO decoder, for use with data arriving in chunks from sockets, serial
+ports and similar sources, where the caller controls reading of the input."""
+
+from __future__ import annotations
+
+from . import bit_reader
+from . import decoder
+from . import exceptions
+from . import framing
+
+import collections
+
+
+class TablogPushDecoder(decoder._DecoderBase):
+    """Decoder that gets the encoded data pushed in by the caller.
+
+    Input can be split into chunks at any position (inside escape sequences or
+    in the middle of values), rows are returned as soon as all of their data was
+    fed in, without waiting for the end of the block.
+
+    Framing and decoding errors are raised from the call that encounters them,
+    rows decoded before the error in that call are returned by the next call
+    to feed or finish. The decoder can still be used after a framing error."""
+
+    def __init__(self, columns=None):
+        """columns: Names of the fields to decode, same as in TablogDecoder."""
+        self._framing = framing.FramingDecoder()
+        self._columns = self._column_names(columns)
+        self.stats = None
+        self._items = collections.deque()  # Framing blocks and errors to process
+        self._pending_rows = []  # Rows to be returned by the next call
+        self._had_block = False
+
+        self._bit_reader = None
+        self.field_names = None
+        self.field_types = None
+        self._header = None  # Names and types of all fields in the last header
+        self._row_decoder = None
+        self._state = None
+        self._header_bits = None  # Length and value of the last block header
+
+        self._buffer = bytearray()  # Not yet decoded data of the current block
+        self._skip_bits = 0  # Bits at the start of _buffer that were already read
+        self._has_header = False  # The header of the current block was read
+
+    def feed(self, data) -> list[list[int]]:
+        """Process a chunk of input, return list of rows that it completed."""
+        self._items.extend(self._framing.feed(data))
+        rows = self._process_items()
+
+        self._buffer += self._framing.take_partial_block()
+        # The last byte might contain the end of block mark, so it can only be
+        # decoded once the whole block is available.
+        if len(self._buffer) > 1:
+            try:
+                self._decode(self._buffer[:-1], rows, False)
+            except Exception:
+                self._pending_rows = rows
+                raise
+
+        return rows
+
+    def finish(self) -> list[list[int]]:
+        """Signal the end of input, return list of the remaining rows.
+        Raises InputEmptyError if there was no block in the whole input."""
+        self._items.extend(self._framing.finish())
+        rows = self._process_items()
+
+        if not self._had_block:
+            raise exceptions.InputEmptyError("No data to decode")
+
+        return rows
+
+    def _process_items(self):
+        rows = self._pending_rows
+        self._pending_rows = []
+
+        while self._items:
+            item = self._items.popleft()
+            if isinstance(item, framing.FramingError):
+                self._pending_rows = rows
+                raise item
+
+            self._had_block = True
+            self._buffer += item
+            try:
+                self._decode(self._buffer, rows, True)
+            except Exception:
+                self._pending_rows = rows
+                raise
+            finally:
+                self._buffer = bytearray()
+                self._skip_bits = 0
+                self._has_header = False
+
+        return rows
+
+    def _decode(self, data, rows, complete):
+        """Decode rows from data of the current block, append them to rows.
+        If the block is not complete, stops before the first row that is not
+        fully contained in the data and keeps the remaining data for the next
+        call."""
+        self._bit_reader = bit_reader.BitReader(data, end_mark=complete)
+        self._bit_reader.read(self._skip_bits)
+
+        if complete:
+            if not self._has_header:
+                self._read_checked_header()
+            while not self._bit_reader.end_of_block():
+                rows.append(self._read_row())
+            return
+
+        position = self._skip_bits  # Position of the first bit not decoded yet
+        try:
+            if not self._has_header:
+                self._read_checked_header()
+                self._has_header = True
+            position = self._bit_reader.position()
+
+            while True:
+                # Decoding state is only updated once the whole row was read
+                rows.append(self._read_row())
+                position = self._bit_reader.position()
+        except bit_reader.IncompleteRead:
+            pass
+
+        del self._buffer[: position // 8]
+        self._skip_bits = position % 8
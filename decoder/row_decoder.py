@@ -0,0 +1,366 @@
+"""Row decoding functions generated for a specific block schema.
+
+Decoding values through the predictor and decoder objects costs several method
+calls per value. Instead, we generate the code of a row decoding loop for each
+combination of field types, with the `Adapt(Last, LinearO2)` predictors, the
+adaptive exp-Golomb decoders and most of the bit reading inlined and their state
+kept in local variables.
+
+State of the decoding is kept in a flat list, with four values per field:
+Golomb decoder state, the value before the last one, the last value and the
+selector of the Adapt predictor. The generated functions only store the state
+back to the list once they are done."""
+
+from __future__ import annotations
+
+from . import decoder_utils
+
+import functools
+import textwrap
+
+selector_max = 8  # Adapt predictor parameter used by the encoder
+
+_golomb_state_shift = decoder_utils.AdaptiveExpGolombDecoder._state_shift
+_state_size = 4  # Number of state values per field
+
+
+class RowDecoder:
+    """Generated decoding functions for one combination of field types and
+    selected output columns (tuple of field indices, `columns` attribute).
+    Bits of all fields are parsed, but values of fields that are not selected
+    are not reconstructed.
+
+    decode_row(bit_reader, state) -> list
+        Decode a single row, return values of the selected columns.
+        If the input ends in the middle of the row,
+        IncompleteRead is raised and the state is left unchanged.
+
+    decode_rows(bit_reader, state, max_rows, appends) -> int
+        Decode rows until the end of block or until max_rows rows were decoded
+        (unlimited if max_rows is None), pass each value to the append callable
+        of its column. Returns number of rows decoded.
+
+    decode_residuals(bit_reader, state, max_rows, appends) -> int
+        Same as decode_rows, but only parses the prediction errors (residuals)
+        without reconstructing the values. Values are then reconstructed
+        one column at a time by reconstruct_column.
+        Rows are decoded in two phases like this when reading columns, the bit
+        stream parsing doesn't depend on the decoded values.
+
+    Instrumented row decoders (instrumented attribute) collect statistics
+    of every field into stats.ColumnStats objects passed in an additional
+    `counters` parameter of decode_row and decode_rows.
+    They don't have decode_residuals."""
+
+    def __init__(self, type_keys, columns, instrumented=False):
+        self._type_keys = type_keys
+        self.columns = columns
+        self.instrumented = instrumented
+        self.source = _generate_source(type_keys, columns, instrumented)
+        namespace = {"decode_elias_gamma_slow": decoder_utils._decode_elias_gamma_slow}
+        exec(
+            compile(self.source, f"<row decoder {type_keys} {columns}>", "exec"),
+            namespace,
+        )
+        self.decode_row = namespace["decode_row"]
+        self.decode_rows = namespace["decode_rows"]
+        self.decode_residuals = namespace.get("decode_residuals")
+
+    def initial_state(self) -> list[int]:
+        """Return decoding state at the beginning of a block."""
+        state = []
+        for _, bitsize in self._type_keys:
+            state.extend([(bitsize // 8) << _golomb_state_shift, 0, 0, 0])
+        return state
+
+    def reconstruct_column(self, state, i, residuals, append):
+        """Reconstruct values of field i from its residuals produced by
+        decode_residuals, pass them to append. The values must be reconstructed
+        from all residuals in the order they were decoded."""
+        minimum, maximum = _minmax(*self._type_keys[i])
+        value_range = maximum - minimum + 1
+        lowest_selector = -selector_max
+        highest_selector = selector_max - 1
+
+        offset = _state_size * i
+        _, h, l, s = state[offset : offset + _state_size]
+
+        for error in residuals:
+            linear = 2 * l - h
+            if linear > maximum:
+                linear -= value_range
+            elif linear < minimum:
+                linear += value_range
+
+            if s >= 0:
+                v = l - error
+                error_last = abs(error)
+                error_linear = abs(linear - v)
+            else:
+                v = linear - error
+                error_last = abs(l - v)
+                error_linear = abs(error)
+
+            if error_last < error_linear:
+                if s < highest_selector:
+                    s += 1
+            elif error_last > error_linear:
+                if s > lowest_selector:
+                    s -= 1
+            h = l
+            l = v
+            append(v)
+
+        state[offset + 1 : offset + _state_size] = (h, l, s)
+
+
+def get_row_decoder(field_types, columns=None, instrumented=False) -> RowDecoder:
+    """Return (cached) row decoder for the given field types.
+    columns is a sequence of indices of fields to output, None means all fields."""
+    if columns is None:
+        columns = range(len(field_types))
+    return _get_row_decoder(
+        tuple((t.signed, t.bitsize) for t in field_types), tuple(columns), instrumented
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _get_row_decoder(type_keys, columns, instrumented):
+    return RowDecoder(type_keys, columns, instrumented)
+
+
+def _generate_source(type_keys, columns, instrumented):
+    state_names = []
+    value_bodies = []
+    residual_bodies = []
+    for i, (signed, bitsize) in enumerate(type_keys):
+        state_names.extend([f"g{i}", f"h{i}", f"l{i}", f"s{i}"])
+        error_source = _error_source(i, bitsize)
+        if instrumented:
+            error_source = _instrumented_error_source(i, error_source)
+        if i in columns:
+            prediction_source = _prediction_source(i, signed, bitsize)
+            if instrumented:
+                prediction_source = (
+                    f"c{i}.selectors[s{i} + {selector_max}] += 1\n" + prediction_source
+                )
+            value_bodies.append(error_source + prediction_source)
+            residual_bodies.append(error_source + f"v{i} = error\n")
+        else:
+            value_bodies.append(error_source)
+            residual_bodies.append(error_source)
+
+    state = "".join(f"{name}, " for name in state_names)
+    golomb_state = "".join(f"g{i}, " for i in range(len(type_keys)))
+    values = ", ".join(f"v{i}" for i in columns)
+    if instrumented:
+        counters_param = ", counters"
+        counters = "".join(f"c{i}, " for i in range(len(type_keys)))
+        load_counters = f"    ({counters}) = counters\n"
+    else:
+        counters_param = ""
+        load_counters = ""
+
+    decode_rows = _rows_loop_source(
+        "decode_rows",
+        columns,
+        "".join(value_bodies),
+        state,
+        "state[:]",
+        counters_param,
+        load_counters,
+    )
+    if instrumented:
+        decode_residuals = ""
+    else:
+        decode_residuals = _rows_loop_source(
+            "decode_residuals",
+            columns,
+            "".join(residual_bodies),
+            golomb_state,
+            f"state[::{_state_size}]",
+        )
+
+    return f"""\
+def decode_row(bit_reader, state{counters_param}):
+    fill = bit_reader.fill
+    buf = bit_reader._bufer
+    remaining = bit_reader._remaining
+    ({state}) = state
+{load_counters}{textwrap.indent("".join(value_bodies), "    ")}
+    bit_reader._bufer = buf
+    bit_reader._remaining = remaining
+    state[:] = ({state})
+    return [{values}]
+
+
+{decode_rows}
+
+
+{decode_residuals}
+"""
+
+
+def _rows_loop_source(
+    name, columns, body, state, state_expression, counters_param="", load_counters=""
+):
+    """Source of a function decoding rows in a loop using given body, passing
+    values of the columns to appends, with the decoding state variables loaded
+    from and stored to state_expression."""
+    return f"""\
+def {name}(bit_reader, state, max_rows, appends{counters_param}):
+    fill = bit_reader.fill
+    buf = bit_reader._bufer
+    remaining = bit_reader._remaining
+    ({"".join(f"append{i}, " for i in columns)}) = appends
+{load_counters}    ({state}) = {state_expression}
+    count = 0
+    try:
+        while count != max_rows:
+            if remaining < {_fast_bits}:
+{textwrap.indent(_fill_source, "                ")}
+                if remaining == 0:
+                    break
+{textwrap.indent(body, "            ")}
+            {"; ".join(f"append{i}(v{i})" for i in columns) or "pass"}
+            count += 1
+    finally:
+        bit_reader._bufer = buf
+        bit_reader._remaining = remaining
+        {state_expression} = ({state})
+    return count"""
+
+
+# Longest valid encoded value (hit bit, sign bit, Elias gamma coded quotient with
+# at most 64 zero bits and up to 63 bits of remainder) plus the lookahead that
+# BitReader needs to detect the end of block mark.
+_fast_bits = 2 + (2 * 64 + 1) + 63 + 9
+
+# Number of bits loaded when the local bit buffer runs low
+_fill_bits = 1024
+
+_fill_source = f"""\
+bit_reader._bufer = buf
+bit_reader._remaining = remaining
+fill({_fill_bits})
+buf = bit_reader._bufer
+remaining = bit_reader._remaining"""
+
+
+def _minmax(signed, bitsize):
+    if signed:
+        return (-(1 << (bitsize - 1)), (1 << (bitsize - 1)) - 1)
+    else:
+        return (0, (1 << bitsize) - 1)
+
+
+def _error_source(i, bitsize):
+    """Source code decoding prediction error of a single value of field i into
+    variable `error`. g{i} is the Golomb decoder state.
+
+    Bits are normally taken directly from the local bit buffer `buf`.
+    Near the end of the block (and for invalid values), the decoding goes
+    through the bit reader, to keep its end of block detection and errors."""
+    max_golomb_state = (bitsize << _golomb_state_shift) - 1
+
+    return f"""\
+if remaining < {_fast_bits}:
+{textwrap.indent(_fill_source, "    ")}
+if remaining < {_fast_bits}:
+    bit_reader._bufer = buf
+    bit_reader._remaining = remaining
+    if bit_reader.read(1):
+        error = 0
+    else:
+        high = bit_reader.read(1)
+        k = g{i} >> {_golomb_state_shift}
+        p = decode_elias_gamma_slow(bit_reader)
+        error = (p << k | bit_reader.read(k)) + 1
+{textwrap.indent(_golomb_update_source(i, max_golomb_state), "        ")}
+        if not high:
+            error = -error
+    buf = bit_reader._bufer
+    remaining = bit_reader._remaining
+elif buf & 1:
+    buf >>= 1
+    remaining -= 1
+    error = 0
+else:
+    high = buf & 2
+    k = g{i} >> {_golomb_state_shift}
+    buf >>= 2
+    remaining -= 2
+    bits = (buf & -buf).bit_length() - 1
+    if 0 <= bits <= 64:
+        length = 2 * bits + 1 + k
+        v = buf & ((1 << length) - 1)
+        buf >>= length
+        remaining -= length
+        p = (1 << bits | (v >> (bits + 1)) & ((1 << bits) - 1)) - 1
+        error = (p << k | v >> (2 * bits + 1)) + 1
+    else:
+        # Not a valid value, but decode it the same way as the bit reader would
+        bit_reader._bufer = buf
+        bit_reader._remaining = remaining
+        p = decode_elias_gamma_slow(bit_reader)
+        error = (p << k | bit_reader.read(k)) + 1
+        buf = bit_reader._bufer
+        remaining = bit_reader._remaining
+{textwrap.indent(_golomb_update_source(i, max_golomb_state), "    ")}
+    if not high:
+        error = -error
+"""
+
+
+def _instrumented_error_source(i, error_source):
+    """Wrap the error decoding source with code updating statistics in c{i}.
+    Bit position is calculated from the bit reader and the local `remaining`,
+    which stays valid also across the buffer refills."""
+    position = "8 * bit_reader._pos - bit_reader._end_bits - remaining"
+    return f"""\
+start = {position}
+c{i}.golomb_states[g{i}] += 1
+{error_source}\
+c{i}.values += 1
+if error == 0:
+    c{i}.hits += 1
+c{i}.bits += {position} - start
+"""
+
+
+def _prediction_source(i, signed, bitsize):
+    """Source code reconstructing value of field i into variable v{i} from the
+    prediction error in variable `error`.
+    h{i} and l{i} are the two previous values (the last value is also
+    the prediction of the Last predictor), s{i} is the Adapt selector
+    (>= 0 selects Last, < 0 selects LinearO2)."""
+    minimum, maximum = _minmax(signed, bitsize)
+    value_range = maximum - minimum + 1
+
+    return f"""\
+linear = 2 * l{i} - h{i}
+if linear > {maximum}:
+    linear -= {value_range}
+elif linear < {minimum}:
+    linear += {value_range}
+v{i} = (l{i} if s{i} >= 0 else linear) - error
+error_last = abs(l{i} - v{i})
+error_linear = abs(linear - v{i})
+if error_last < error_linear:
+    if s{i} < {selector_max - 1}:
+        s{i} += 1
+elif error_last > error_linear:
+    if s{i} > {-selector_max}:
+        s{i} -= 1
+h{i} = l{i}
+l{i} = v{i}
+"""
+
+
+def _golomb_update_source(i, max_golomb_state):
+    return f"""\
+if p == 0:
+    if g{i} > 0:
+        g{i} -= 1
+elif p > 1 and g{i} < {max_golomb_state}:
+    g{i} += 1"""
@@ -0,0 +1,66 @@
+"""Decoding statistics, collected by TablogDecoder when created with stats=True.
+
+Collecting the per column statistics uses an instrumented variant of the
+generated row decoding code, decoders without statistics run the same code
+as before."""
+
+from __future__ import annotations
+
+from . import decoder_utils
+from . import row_decoder
+
+import collections
+import dataclasses
+
+_golomb_state_shift = decoder_utils.AdaptiveExpGolombDecoder._state_shift
+
+
+@dataclasses.dataclass
+class ColumnStats:
+    name: bytes
+    values: int = 0  # Number of values decoded
+    hits: int = 0  # Values that matched the prediction exactly
+    bits: int = 0  # Size of the encoded values in bits
+    # Histogram of the adaptive exp-Golomb decoder state used for each value
+    # (state >> 2 is the number of remainder bits), indexed by the state.
+    golomb_states: list[int] = dataclasses.field(default_factory=list)
+    # Histogram of the Adapt predictor selector used for each value, indexed by
+    # selector + selector_max. Selectors >= 0 choose the Last predictor,
+    # the negative ones LinearO2.
+    # Stays zero for columns that were not selected for decoding.
+    selectors: list[int] = dataclasses.field(default_factory=list)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.values if self.values else 0.0
+
+    @property
+    def selector_max(self) -> int:
+        return row_decoder.selector_max
+
+
+@dataclasses.dataclass
+class DecoderStats:
+    blocks: int = 0  # Blocks decoded
+    rows: int = 0  # Rows decoded
+    bytes: int = 0  # Bytes of the block data decoded (without framing)
+    # Framing errors encountered, by exception class name
+    framing_errors: collections.Counter = dataclasses.field(
+        default_factory=collections.Counter
+    )
+    # Statistics for all fields of the header, including the fields that
+    # were not selected for decoding (their values still need to be parsed)
+    columns: list[ColumnStats] = dataclasses.field(default_factory=list)
+
+    def _set_header(self, field_names, field_types):
+        """Prepare the column statistics when the first header is read."""
+        if self.columns:
+            return
+        self.columns = [
+            ColumnStats(
+                name,
+                golomb_states=[0] * (t.bitsize << _golomb_state_shift),
+                selectors=[0] * (2 * row_decoder.selector_max),
+            )
+            for name, t in zip(field_names, field_types)
+        ]
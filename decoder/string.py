@@ -20,36 +20,93 @@ _decoder_trie = (
 # fmt: on
 
 
-def _decode_non_match_group(count, bit_reader):
-    return (bytes([bit_reader.read(8)]) for _ in range(count))
+_table_bits = 8  # Number of bits used to index a single level of the lookup table
 
 
-def _decode_match_group(count, bit_reader):
-    for i in range(count):
-        current = _decoder_trie
-        while True:
-            bit = bit_reader.read_bit()
-            current = current[bit]
+def _trie_depth(node):
+    if isinstance(node, bytes):
+        return 0
+    return 1 + max(_trie_depth(node[0]), _trie_depth(node[1]))
+
+
+def _build_table(node):
+    """Flatten the trie into a lookup table indexed by the next _table_bits bits
+    of input (first bit in the least significant position).
+    Each entry is a tuple (symbol, number of bits used), codes longer than
+    _table_bits have a nested table instead of the symbol."""
+    table = []
+    for index in range(1 << _table_bits):
+        current = node
+        for length in range(1, _table_bits + 1):
+            current = current[(index >> (length - 1)) & 1]
             if isinstance(current, bytes):
-                yield current
+                table.append((current, length))
                 break
+        else:
+            table.append((_build_table(current), _table_bits))
+    return tuple(table)
+
+
+_max_code_length = _trie_depth(_decoder_trie)
+_decoder_table = _build_table(_decoder_trie)
+
+
+def _decode_non_match_group(count, bit_reader):
+    return bytes(bit_reader.read_many(8, count))
+
+
+def _decode_match_group(count, bit_reader):
+    table_mask = (1 << _table_bits) - 1
+    parts = []
+    while count:
+        # Decoding as many symbols as possible from a single lookahead
+        lookahead, available = bit_reader.peek(decoder_utils._lookahead_bits)
+        used = 0
+        while count and used + _max_code_length <= available:
+            symbol, length = _decoder_table[(lookahead >> used) & table_mask]
+            while not isinstance(symbol, bytes):
+                symbol, sublength = symbol[(lookahead >> (used + length)) & table_mask]
+                length += sublength
+            parts.append(symbol)
+            used += length
+            count -= 1
+
+        if used:
+            bit_reader.read(used)
+        else:
+            # Not enough data left for the table lookup,
+            # let the bit reader raise the right error
+            parts.append(_decode_symbol_slow(bit_reader))
+            count -= 1
+
+    return b"".join(parts)
+
+
+def _decode_symbol_slow(bit_reader):
+    """Walk the trie bit by bit"""
+    current = _decoder_trie
+    while True:
+        bit = bit_reader.read_bit()
+        current = current[bit]
+        if isinstance(current, bytes):
+            return current
 
 
 def _decode_string_parts(bit_reader):
     count = decoder_utils.decode_elias_gamma(bit_reader)
     if count > 0:
-        yield from _decode_match_group(count, bit_reader)
+        yield _decode_match_group(count, bit_reader)
 
     while True:
         count = decoder_utils.decode_elias_gamma(bit_reader)
         if not count:
             return
-        yield from _decode_non_match_group(count, bit_reader)
+        yield _decode_non_match_group(count, bit_reader)
 
         count = decoder_utils.decode_elias_gamma(bit_reader)
         if not count:
             return
-        yield from _decode_match_group(count, bit_reader)
+        yield _decode_match_group(count, bit_reader)
 
 
 def decode_string(bit_reader):
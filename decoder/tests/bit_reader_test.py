@@ -81,3 +81,107 @@ def test_too_large_read():
         br.read(2)
     assert exc_info.value.remaining == 1
     assert exc_info.value.nbits == 2
+
+
+def _read_all(br, sizes):
+    """Perform reads of given sizes, return list of results and end_of_block
+    states, with IncompleteRead exceptions captured."""
+    ret = []
+    for nbits in sizes:
+        try:
+            ret.append((br.read(nbits), br.end_of_block()))
+        except bit_reader.IncompleteRead as e:
+            ret.append((e.nbits, e.remaining))
+    return ret
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.binary(max_size=100),
+    sizes=hypothesis.strategies.lists(hypothesis.strategies.integers(0, 100)),
+)
+@pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+def test_buffer_matches_iterator(buffer_type, data, sizes):
+    """Check that reading from a contiguous buffer behaves exactly the same as
+    reading byte by byte from an iterator"""
+    from_iterator = bit_reader.BitReader(iter(data))
+    from_buffer = bit_reader.BitReader(buffer_type(data))
+
+    assert from_buffer.end_of_block() == from_iterator.end_of_block()
+    assert _read_all(from_buffer, sizes) == _read_all(from_iterator, sizes)
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.data(),
+    sizes=hypothesis.strategies.lists(hypothesis.strategies.integers(0, 100)),
+    fill=hypothesis.strategies.integers(0, 1000),
+)
+def test_chunked_matches_iterator(data, sizes, fill):
+    """Reading from a sequence of chunks behaves the same as reading the
+    concatenated data byte by byte"""
+    chunks = data.draw(
+        hypothesis.strategies.lists(hypothesis.strategies.binary(max_size=20))
+    )
+    from_iterator = bit_reader.BitReader(iter(b"".join(chunks)))
+    from_chunks = bit_reader.BitReader(chunks, chunked=True)
+
+    from_iterator.fill(fill)
+    from_chunks.fill(fill)
+    assert from_chunks.end_of_block() == from_iterator.end_of_block()
+    assert _read_all(from_chunks, sizes) == _read_all(from_iterator, sizes)
+    assert from_chunks.position() == from_iterator.position()
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.binary(max_size=300),
+    nbits=hypothesis.strategies.integers(0, 70),
+    count=hypothesis.strategies.integers(0, 100),
+)
+def test_read_many(data, nbits, count):
+    """Check that read_many returns the same values and raises the same exception
+    as a sequence of individual reads"""
+    br_single = bit_reader.BitReader(data)
+    br_many = bit_reader.BitReader(data)
+
+    expected = []
+    try:
+        for _ in range(count):
+            expected.append(br_single.read(nbits))
+    except bit_reader.IncompleteRead as e:
+        with pytest.raises(bit_reader.IncompleteRead) as exc_info:
+            br_many.read_many(nbits, count)
+        assert exc_info.value.nbits == e.nbits
+        assert exc_info.value.remaining == e.remaining
+    else:
+        assert br_many.read_many(nbits, count) == expected
+        assert br_many.end_of_block() == br_single.end_of_block()
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.binary(max_size=64),
+    reads=hypothesis.strategies.lists(hypothesis.strategies.integers(0, 70)),
+)
+def test_position_without_end_mark(data, reads):
+    """Without the end mark all bits are readable and position counts them"""
+    br = bit_reader.BitReader(data, end_mark=False)
+    value = int.from_bytes(data, "little")
+    position = 0
+    for nbits in reads:
+        if position + nbits > 8 * len(data):
+            with pytest.raises(bit_reader.IncompleteRead):
+                br.read(nbits)
+            break
+        assert br.read(nbits) == (value >> position) & ((1 << nbits) - 1)
+        position += nbits
+        assert br.position() == position
+    else:
+        assert br.end_of_block() == (position == 8 * len(data))
+
+
+@hypothesis.given(data=hypothesis.strategies.binary(max_size=64))
+def test_position_at_end(data):
+    br = bit_reader.BitReader(data + b"\x03")  # Data + one bit + end marker
+    br.read(8 * len(data))
+    assert br.position() == 8 * len(data)
+    br.read_bit()
+    assert br.end_of_block()
+    assert br.position() == 8 * len(data) + 1
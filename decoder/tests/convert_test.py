@@ -0,0 +1,45 @@
+import decoder.convert
+
+import pytest
+import hypothesis
+import io
+
+
+@hypothesis.given(
+    v=hypothesis.strategies.integers(-(2**40), 2**40),
+    decimals=hypothesis.strategies.integers(0, 6),
+)
+def test_fixed_point_roundtrip(v, decimals):
+    """Formatted values convert back the same way as the datasets CSV loader does"""
+    multiplier = 10**decimals
+    s = decoder.convert._fixed_point_formatter(multiplier)(v)
+    assert round(float(s) * multiplier) == v
+    integer, _, fraction = s.lstrip("-").partition(".")
+    assert len(fraction) == decimals
+    assert int(integer + fraction) == abs(v)
+
+
+@pytest.mark.parametrize(
+    "multiplier, v, expected",
+    [(1000, -5, "-0.005"), (10, 12345, "1234.5"), (1, -3, "-3"), (4, 3, "0.75")],
+)
+def test_fixed_point_examples(multiplier, v, expected):
+    assert decoder.convert._fixed_point_formatter(multiplier)(v) == expected
+
+
+@pytest.mark.parametrize("length", [0, 1, 10**19])
+def test_npy_header(length):
+    """Header has the same size regardless of the length, numpy can read it"""
+    numpy = pytest.importorskip("numpy")
+    npy_format = pytest.importorskip("numpy.lib.format")
+
+    fp = io.BytesIO()
+    decoder.convert._write_npy_header(fp, "<u2", length)
+    assert len(fp.getvalue()) == decoder.convert._npy_header_size
+
+    fp.seek(0)
+    assert npy_format.read_magic(fp) == (1, 0)
+    shape, fortran_order, dtype = npy_format.read_array_header_1_0(fp)
+    assert shape == (length,)
+    assert not fortran_order
+    assert dtype == numpy.dtype("<u2")
@@ -1,8 +1,11 @@
 import pytest
+import hypothesis
 
 from decoder import decoder_utils
 from decoder import bit_reader
 
+from .strategies import block_data
+
 
 @pytest.mark.parametrize(
     "data,expected",
@@ -17,3 +20,60 @@ def test_decode_elias_gamma_manual(data, expected):
     The examples already contain bit reader end mark"""
     br = bit_reader.BitReader(data)
     assert decoder_utils.decode_elias_gamma(br) == expected
+
+
+def _decode_all(decode, br, count):
+    """Call decode count times, return list of the results, ending with the
+    exception parameters if the data ran out"""
+    ret = []
+    try:
+        for _ in range(count):
+            ret.append(decode(br))
+    except bit_reader.IncompleteRead as e:
+        ret.append((e.nbits, e.remaining))
+    return ret
+
+
+def _reference_adaptive_exp_golomb(bit_width):
+    """Straightforward bit by bit implementation of the adaptive exp golomb decoder"""
+    state = (bit_width // 8) << 2
+    max_state = (bit_width << 2) - 1
+
+    def decode(br):
+        nonlocal state
+        k = state >> 2
+        p = decoder_utils._decode_elias_gamma_slow(br)
+
+        if p == 0 and state > 0:
+            state -= 1
+        elif p > 1 and state < max_state:
+            state += 1
+
+        return p << k | br.read(k)
+
+    return decode
+
+
+@hypothesis.given(data=block_data(max_size=200))
+def test_decode_elias_gamma_matches_slow(data):
+    """Check that the lookahead based decoding matches bit by bit decoding"""
+    fast = _decode_all(
+        decoder_utils.decode_elias_gamma, bit_reader.BitReader(data), 100
+    )
+    slow = _decode_all(
+        decoder_utils._decode_elias_gamma_slow, bit_reader.BitReader(data), 100
+    )
+    assert fast == slow
+
+
+@hypothesis.given(
+    data=block_data(max_size=200),
+    bit_width=hypothesis.strategies.sampled_from([8, 16, 32, 64]),
+)
+def test_adaptive_exp_golomb_matches_reference(data, bit_width):
+    decoder = decoder_utils.AdaptiveExpGolombDecoder(bit_width)
+    fast = _decode_all(decoder.decode, bit_reader.BitReader(data), 100)
+    reference = _decode_all(
+        _reference_adaptive_exp_golomb(bit_width), bit_reader.BitReader(data), 100
+    )
+    assert fast == reference
@@ -2,6 +2,7 @@ import hypothesis
 import pytest
 
 import collections.abc
+import mmap
 
 from decoder import framing
 
@@ -146,3 +147,174 @@ def flattened_block_decoding_inputs(draw):
 def test_block_decoding(data):
     input_data, expected_flattened = data
     assert flattened_framing(input_data) == expected_flattened
+
+
+def flattened_framing_blocks(data):
+    """Same as flattened_framing, but uses decode_framing_blocks"""
+    output = []
+    for item in framing.decode_framing_blocks(data):
+        if isinstance(item, framing.UnexpectedCharacters):
+            output.append(b"C")
+        elif isinstance(item, framing.UnexpectedEndOfData):
+            output.append(b"X")
+        else:
+            output.append(b"(")
+            output.append(bytes(item))
+            output.append(b")")
+
+    return b"".join(output)
+
+
+@hypothesis.strategies.composite
+def chunked(draw, data):
+    """Split data into a list of chunks at random positions"""
+    split_points = sorted(
+        draw(hypothesis.strategies.lists(hypothesis.strategies.integers(0, len(data))))
+    )
+    return [data[a:b] for a, b in zip([0] + split_points, split_points + [len(data)])]
+
+
+@hypothesis.given(flattened_block_decoding_inputs())
+def test_blocks_decoding(data):
+    input_data, expected_flattened = data
+    assert flattened_framing_blocks(input_data) == expected_flattened
+
+
+@hypothesis.given(data=hypothesis.strategies.data())
+def test_blocks_chunked_input(data):
+    input_data, expected_flattened = data.draw(flattened_block_decoding_inputs())
+    chunks = data.draw(chunked(input_data))
+    assert flattened_framing_blocks(chunks) == expected_flattened
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.text(alphabet="Tl# x").map(lambda x: x.encode("ascii"))
+)
+def test_blocks_match_decode_framing(data):
+    """Check that the block decoder matches the iterator based decoder on input
+    with random escape sequences"""
+
+    # decode_framing passes the block start marker inside of a block as data,
+    # decode_framing_blocks ends the block instead, skip these cases.
+    in_block = False
+    for item in framing.decode_framing_raw(data):
+        if item is framing.block_start_marker:
+            hypothesis.assume(not in_block)
+            in_block = True
+        elif item is framing.block_end_marker:
+            in_block = False
+
+    assert flattened_framing_blocks(data) == flattened_framing(data)
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.text(alphabet="Tl# x").map(lambda x: x.encode("ascii")),
+    chunking=hypothesis.strategies.data(),
+)
+def test_blocks_chunked_matches_whole(data, chunking):
+    chunks = chunking.draw(chunked(data))
+    assert flattened_framing_blocks(chunks) == flattened_framing_blocks(data)
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.text(alphabet="Tl# x").map(lambda x: x.encode("ascii")),
+    chunking=hypothesis.strategies.data(),
+)
+def test_streamed_matches_blocks(data, chunking):
+    chunks = chunking.draw(chunked(data))
+    output = []
+    for item in framing.decode_framing_streamed(chunks):
+        if isinstance(item, framing.FramingError):
+            output.append(item)
+        else:
+            output.append(b"".join(item))
+
+    expected = [
+        item if isinstance(item, framing.FramingError) else bytes(item)
+        for item in framing.decode_framing_blocks(data)
+    ]
+    assert [(type(item), str(item)) for item in output] == [
+        (type(item), str(item)) for item in expected
+    ]
+
+
+def test_streamed_parts_before_block_end():
+    pulled = []
+
+    def chunks():
+        for chunk in [b"xTl12", b"3T", b" 4", b"T#Tl5", b"T#"]:
+            pulled.append(chunk)
+            yield chunk
+
+    it = framing.decode_framing_streamed(chunks())
+    assert isinstance(next(it), framing.UnexpectedCharacters)
+    block = next(it)
+    assert bytes(next(block)) == b"12"
+    assert len(pulled) == 1
+    assert b"".join(block) == b"3T4"
+
+    # Skipped without being read
+    next(it)
+    assert list(it) == []
+    assert len(pulled) == 5
+
+
+def test_blocks_start_inside_block():
+    assert flattened_framing_blocks(b"Tl12Tl3T#") == b"(12)X(3)"
+
+
+def test_blocks_zero_copy():
+    """Check that blocks without escape sequences are not copied"""
+    data = b"xTl123T#Tl4T 5T#"
+    blocks = list(framing.decode_framing_blocks(data))
+    assert isinstance(blocks[1], memoryview)
+    assert blocks[1].obj is data
+    assert bytes(blocks[2]) == b"4T5"
+
+
+@pytest.fixture(params=[bytes, bytearray, memoryview, "mmap"])
+def buffer_type(request, tmp_path):
+    if request.param == "mmap":
+
+        def make_mmap(data):
+            path = tmp_path / "data"
+            path.write_bytes(data)
+            with open(path, "rb") as fp:
+                return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return make_mmap
+    else:
+        return request.param
+
+
+def test_blocks_buffer_types(buffer_type):
+    data = b"xTl123T#Tl4T 5T#Tl"
+    assert flattened_framing_blocks(buffer_type(data)) == b"C(123)(4T5)()X"
+
+
+def test_raw_buffer_types(buffer_type):
+    assert list(framing.decode_framing_raw(buffer_type(b"aT b"))) == list(b"aTb")
+
+
+def _blocks_with_offsets(data):
+    return [
+        (start, end, bytes(block))
+        for start, end, block in (
+            item
+            for item in framing.decode_framing_blocks(data, with_offsets=True)
+            if not isinstance(item, framing.FramingError)
+        )
+    ]
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.text(alphabet="Tl# x").map(lambda x: x.encode("ascii")),
+    chunking=hypothesis.strategies.data(),
+)
+def test_blocks_offsets(data, chunking):
+    """Check that block offsets point to data that decodes to the same block"""
+    blocks = _blocks_with_offsets(data)
+    for start, end, block in blocks:
+        assert _blocks_with_offsets(data[start:end]) == [(0, end - start, block)]
+
+    assert _blocks_with_offsets(chunking.draw(chunked(data))) == blocks
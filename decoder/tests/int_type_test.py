@@ -3,6 +3,7 @@ import decoder.int_type
 import pytest
 import hypothesis
 import struct
+import array
 
 from . import strategies
 
@@ -61,3 +62,46 @@ def test_convert_unsigned_from_unsigned(param):
     """Check that converting a value from unsigned to unsigned doesn't change it"""
     converted = param[0].convert_unsigned(param[1])
     assert converted == param[1]
+
+
+@hypothesis.given(int_type=strategies.int_types())
+def test_array_typecode(int_type):
+    """Check that the array typecode has the right size and range"""
+    a = array.array(int_type.array_typecode(), [int_type.min(), int_type.max()])
+    assert a.itemsize == int_type.bytesize()
+    with pytest.raises(OverflowError):
+        a.append(int_type.min() - 1)
+    with pytest.raises(OverflowError):
+        a.append(int_type.max() + 1)
+
+
+@hypothesis.given(int_type=strategies.int_types())
+def test_numpy_dtype(int_type):
+    numpy = pytest.importorskip("numpy")
+    dtype = int_type.numpy_dtype()
+    assert dtype.itemsize == int_type.bytesize()
+    assert numpy.iinfo(dtype).min == int_type.min()
+    assert numpy.iinfo(dtype).max == int_type.max()
+
+
+@hypothesis.given(int_type=strategies.int_types(), other=strategies.int_types())
+def test_hash(int_type, other):
+    copy = decoder.int_type.IntType(int_type.signed, int_type.bitsize)
+    assert hash(copy) == hash(int_type)
+    assert len({int_type, copy, other}) == (1 if other == int_type else 2)
+
+
+@hypothesis.given(
+    int_type=strategies.int_types(),
+    data=hypothesis.strategies.data(),
+)
+def test_convert_unsigned_array(int_type, data):
+    """Check that the vectorized conversion matches convert_unsigned"""
+    pytest.importorskip("numpy")
+    unsigned_type = decoder.int_type.IntType(False, int_type.bitsize)
+    values = data.draw(
+        hypothesis.strategies.lists(strategies.int_type_values(unsigned_type))
+    )
+    converted = int_type.convert_unsigned_array(values)
+    assert converted.dtype == int_type.numpy_dtype()
+    assert converted.tolist() == [int_type.convert_unsigned(v) for v in values]
@@ -0,0 +1,212 @@
+import hypothesis
+
+from decoder import row_decoder
+from decoder import decoder_utils
+from decoder import predictors
+from decoder import bit_reader
+from decoder import stats as stats_module
+
+from .strategies import block_data, int_types
+
+
+def _reference_rows(field_types, br):
+    """Decode rows using the predictor and decoder objects, return list of the
+    rows, ending with the exception parameters if the data ran out"""
+    value_predictors = [
+        predictors.Adapt(
+            t,
+            row_decoder.selector_max,
+            predictors.Last.factory(),
+            predictors.LinearO2.factory(),
+        )
+        for t in field_types
+    ]
+    error_decoders = [
+        decoder_utils.AdaptiveExpGolombDecoder(t.bitsize) for t in field_types
+    ]
+
+    ret = []
+    try:
+        while not br.end_of_block():
+            row = []
+            for predictor, error_decoder in zip(value_predictors, error_decoders):
+                if br.read_bit():
+                    error = 0
+                else:
+                    high = br.read_bit()
+                    error = error_decoder.decode(br) + 1
+                    if not high:
+                        error = -error
+                value = predictor.predict() - error
+                predictor.feed(value)
+                row.append(value)
+            ret.append(row)
+    except bit_reader.IncompleteRead as e:
+        ret.append((e.nbits, e.remaining))
+    return ret
+
+
+@hypothesis.given(
+    data=block_data(max_size=1000),
+    field_types=hypothesis.strategies.lists(int_types(), min_size=1, max_size=5),
+)
+def test_decode_row_matches_reference(data, field_types):
+    decoder = row_decoder.get_row_decoder(field_types)
+    state = decoder.initial_state()
+    br = bit_reader.BitReader(data)
+
+    rows = []
+    try:
+        while not br.end_of_block():
+            rows.append(decoder.decode_row(br, state))
+    except bit_reader.IncompleteRead as e:
+        rows.append((e.nbits, e.remaining))
+
+    assert rows == _reference_rows(field_types, bit_reader.BitReader(data))
+
+
+@hypothesis.given(
+    data=block_data(max_size=1000),
+    field_types=hypothesis.strategies.lists(int_types(), min_size=1, max_size=5),
+    max_rows=hypothesis.strategies.integers(1, 50),
+)
+def test_decode_rows_matches_reference(data, field_types, max_rows):
+    decoder = row_decoder.get_row_decoder(field_types)
+    state = decoder.initial_state()
+    br = bit_reader.BitReader(data)
+
+    columns = [[] for _ in field_types]
+    appends = [column.append for column in columns]
+    rows = []
+    try:
+        while not br.end_of_block():
+            count = decoder.decode_rows(br, state, max_rows, appends)
+            assert count <= max_rows
+            rows.extend(list(row) for row in zip(*columns))
+            for column in columns:
+                column.clear()
+    except bit_reader.IncompleteRead as e:
+        rows.extend(list(row) for row in zip(*columns))
+        rows.append((e.nbits, e.remaining))
+
+    assert rows == _reference_rows(field_types, bit_reader.BitReader(data))
+
+
+@hypothesis.given(
+    data=block_data(max_size=1000),
+    field_types=hypothesis.strategies.lists(int_types(), min_size=1, max_size=5),
+    max_rows=hypothesis.strategies.integers(1, 50),
+)
+def test_two_phase_decoding_matches_reference(data, field_types, max_rows):
+    decoder = row_decoder.get_row_decoder(field_types)
+    state = decoder.initial_state()
+    br = bit_reader.BitReader(data)
+
+    residuals = [[] for _ in field_types]
+    columns = [[] for _ in field_types]
+    error = []
+    try:
+        while not br.end_of_block():
+            decoder.decode_residuals(br, state, max_rows, [r.append for r in residuals])
+            for i, (r, column) in enumerate(zip(residuals, columns)):
+                decoder.reconstruct_column(state, i, r, column.append)
+                r.clear()
+    except bit_reader.IncompleteRead as e:
+        for i, (r, column) in enumerate(zip(residuals, columns)):
+            decoder.reconstruct_column(state, i, r, column.append)
+        error.append((e.nbits, e.remaining))
+
+    rows = [list(row) for row in zip(*columns)] + error
+    assert rows == _reference_rows(field_types, bit_reader.BitReader(data))
+
+
+@hypothesis.strategies.composite
+def _field_types_and_columns(draw):
+    """Field types and a subset of their indices, in random order"""
+    field_types = draw(hypothesis.strategies.lists(int_types(), min_size=1, max_size=5))
+    columns = draw(hypothesis.strategies.permutations(range(len(field_types))))
+    return field_types, columns[: draw(hypothesis.strategies.integers(0, len(columns)))]
+
+
+@hypothesis.given(
+    data=block_data(max_size=1000),
+    field_types_and_columns=_field_types_and_columns(),
+    max_rows=hypothesis.strategies.integers(1, 50),
+)
+def test_selected_columns_match_reference(data, field_types_and_columns, max_rows):
+    field_types, selected = field_types_and_columns
+    decoder = row_decoder.get_row_decoder(field_types, selected)
+    state = decoder.initial_state()
+    br = bit_reader.BitReader(data)
+
+    residuals = [[] for _ in selected]
+    columns = [[] for _ in selected]
+    error = []
+    try:
+        while not br.end_of_block():
+            decoder.decode_residuals(br, state, max_rows, [r.append for r in residuals])
+            for i, r, column in zip(decoder.columns, residuals, columns):
+                decoder.reconstruct_column(state, i, r, column.append)
+                r.clear()
+    except bit_reader.IncompleteRead as e:
+        for i, r, column in zip(decoder.columns, residuals, columns):
+            decoder.reconstruct_column(state, i, r, column.append)
+        error.append((e.nbits, e.remaining))
+
+    reference = _reference_rows(field_types, bit_reader.BitReader(data))
+    if error:
+        reference, reference_error = reference[:-1], reference[-1:]
+        assert error == reference_error
+    if selected:
+        assert [list(row) for row in zip(*columns)] == [
+            [row[i] for i in selected] for row in reference
+        ]
+
+    rows = []
+    state = decoder.initial_state()
+    br = bit_reader.BitReader(data)
+    try:
+        while not br.end_of_block():
+            rows.append(decoder.decode_row(br, state))
+    except bit_reader.IncompleteRead:
+        pass
+    assert rows == [[row[i] for i in selected] for row in reference]
+
+
+@hypothesis.given(
+    data=block_data(max_size=1000),
+    field_types_and_columns=_field_types_and_columns(),
+)
+def test_instrumented_decoder(data, field_types_and_columns):
+    field_types, selected = field_types_and_columns
+    decoder = row_decoder.get_row_decoder(field_types, selected, instrumented=True)
+    stats = stats_module.DecoderStats()
+    stats._set_header([b""] * len(field_types), field_types)
+    state = decoder.initial_state()
+    br = bit_reader.BitReader(data)
+
+    rows = []
+    incomplete = False
+    try:
+        while not br.end_of_block():
+            rows.append(decoder.decode_row(br, state, stats.columns))
+    except bit_reader.IncompleteRead:
+        # Statistics also include the fields before the error
+        incomplete = True
+
+    reference = _reference_rows(field_types, bit_reader.BitReader(data))
+    if incomplete:
+        reference = reference[:-1]
+    assert rows == [[row[i] for i in selected] for row in reference]
+
+    n = len(rows)
+    if not incomplete:
+        assert sum(column.bits for column in stats.columns) == br.position()
+    for i, column in enumerate(stats.columns):
+        assert n <= column.values <= n + incomplete
+        assert n <= sum(column.golomb_states) <= n + incomplete
+        if i in selected:
+            assert n <= sum(column.selectors) <= n + incomplete
+        else:
+            assert sum(column.selectors) == 0
+        assert 0 <= column.hits <= column.values
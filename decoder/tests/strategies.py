@@ -53,3 +53,23 @@ def typed_lists(
     )
 
     return (int_type, lst)
+
+
+@hypothesis.strategies.composite
+def block_data(draw, max_size=100) -> SearchStrategy[bytes]:
+    """Returns a hypothesis strategy that produces random block data, ending
+    with a nonzero byte, as every block does.
+    Half of the time the data is mostly zeros, to get some long Elias gamma
+    prefixes, including ones that are longer than any valid value has."""
+    sparse_data = hypothesis.strategies.lists(
+        hypothesis.strategies.sampled_from(
+            [b"\x00", b"\x00", b"\x01", b"\x10", b"\x80", b"\xff", bytes(10)]
+        ),
+        max_size=max_size // 2,
+    ).map(b"".join)
+    data = draw(
+        hypothesis.strategies.one_of(
+            sparse_data, hypothesis.strategies.binary(max_size=max_size)
+        )
+    )
+    return data + bytes([draw(hypothesis.strategies.integers(1, 255))])
@@ -0,0 +1,71 @@
+import hypothesis
+
+from decoder import string
+from decoder import decoder_utils
+from decoder import bit_reader
+
+
+def _reference_decode_string(br):
+    """Straightforward bit by bit implementation of the string decoder"""
+
+    def match_group(count):
+        ret = b""
+        for _ in range(count):
+            current = string._decoder_trie
+            while not isinstance(current, bytes):
+                current = current[br.read_bit()]
+            ret += current
+        return ret
+
+    def non_match_group(count):
+        return bytes(br.read(8) for _ in range(count))
+
+    ret = match_group(decoder_utils.decode_elias_gamma(br))
+    groups = [non_match_group, match_group]
+    while True:
+        count = decoder_utils.decode_elias_gamma(br)
+        if not count:
+            return ret
+        ret += groups[0](count)
+        groups.reverse()
+
+
+def _decode_all(decode, br):
+    """Decode strings until the end of data, return list of the results,
+    ending with the exception parameters if the data ran out"""
+    ret = []
+    try:
+        while not br.end_of_block():
+            ret.append(decode(br))
+    except bit_reader.IncompleteRead as e:
+        ret.append((e.nbits, e.remaining))
+    return ret
+
+
+def _trie_codes(node, code=0, length=0):
+    """Yield all (symbol, code, code length) from the trie"""
+    if isinstance(node, bytes):
+        yield (node, code, length)
+    else:
+        for bit in (0, 1):
+            yield from _trie_codes(node[bit], code | bit << length, length + 1)
+
+
+def test_lookup_table_matches_trie():
+    for symbol, code, length in _trie_codes(string._decoder_trie):
+        # Data with the code followed by some ones and the end mark
+        data = (code | (0xFFFF << length)).to_bytes(4, "little")
+        br = bit_reader.BitReader(data)
+        assert string._decode_match_group(1, br) == symbol
+        assert br.position() == length
+
+
+@hypothesis.given(
+    data=hypothesis.strategies.binary(max_size=200),
+    last_byte=hypothesis.strategies.integers(1, 255),
+)
+def test_decode_string_matches_reference(data, last_byte):
+    data += bytes([last_byte])  # Blocks always end with a nonzero byte
+    assert _decode_all(string.decode_string, bit_reader.BitReader(data)) == (
+        _decode_all(_reference_decode_string, bit_reader.BitReader(data))
+    )
@@ -0,0 +1,119 @@
+import pytest
+from pyencoder import encoder as encoder_module
+from decoder import batch
+
+import json
+
+
+@pytest.fixture
+def input_dir(timestamp_log, tmp_path, monkeypatch):
+    encode, rows = timestamp_log.encode, timestamp_log.rows
+    d = tmp_path / "input"
+    (d / "device1").mkdir(parents=True)
+    (d / "device2").mkdir()
+
+    (d / "device1" / "day1.tablog").write_bytes(encode(rows(1000)))
+    (d / "device1" / "day2.tablog").write_bytes(encode(rows(10, 1000)))
+    (d / "device2" / "day1.tablog").write_bytes(
+        b"junk" + encode(rows(150)) + b"more junk" + encode(rows(50, 150))
+    )
+    (d / "device2" / "truncated.tablog").write_bytes(encode(rows(150))[:-5])
+    (d / "device2" / "empty.tablog").write_bytes(b"")
+    (d / "device2" / "notes.txt").write_bytes(b"not matching the pattern")
+
+    monkeypatch.setattr(encoder_module, "format_version", 1)
+    (d / "future.tablog").write_bytes(encode(rows(10)))
+
+    return d
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_directory_csv(timestamp_log, input_dir, tmp_path, workers):
+    output_dir = tmp_path / "output"
+    results = batch.convert_directory(input_dir, output_dir, workers=workers)
+    by_path = {r.path: r for r in results}
+
+    assert [r.path for r in results] == sorted(by_path)
+    assert set(by_path) == {
+        "device1/day1.tablog",
+        "device1/day2.tablog",
+        "device2/day1.tablog",
+        "device2/truncated.tablog",
+        "device2/empty.tablog",
+        "future.tablog",
+    }
+
+    r = by_path["device1/day1.tablog"]
+    assert (r.rows, r.blocks, r.framing_errors, r.error) == (1000, 10, [], None)
+    assert r.field_names == timestamp_log.field_names
+    assert r.field_types == ["u32", "s16"]
+    assert r.output == "device1/day1.csv"
+    lines = (output_dir / r.output).read_text().splitlines()
+    assert lines[0] == "timestamp,value"
+    assert lines[1:] == [f"{t},{v}" for t, v in timestamp_log.rows(1000)]
+
+    r = by_path["device2/day1.tablog"]
+    assert (r.rows, r.blocks, r.error) == (200, 3, None)
+    assert len(r.framing_errors) == 2
+    assert r.framing_errors[0].startswith("UnexpectedCharacters")
+    lines = (output_dir / r.output).read_text().splitlines()
+    assert lines[1:] == [
+        f"{t},{v}" for t, v in timestamp_log.rows(150) + timestamp_log.rows(50, 150)
+    ]
+
+    # Rows of the incomplete last block are decoded as far as they go
+    r = by_path["device2/truncated.tablog"]
+    assert (r.blocks, r.error) == (2, None)
+    assert 100 < r.rows < 150
+    assert r.framing_errors == ["UnexpectedEndOfData: Input data ended unexpectedly"]
+    lines = (output_dir / r.output).read_text().splitlines()
+    assert lines[1:] == [f"{t},{v}" for t, v in timestamp_log.rows(r.rows)]
+
+    for path, error in [
+        ("device2/empty.tablog", "InputEmptyError"),
+        ("future.tablog", "UnsupportedVersionError"),
+    ]:
+        r = by_path[path]
+        assert r.error.startswith(error)
+        assert r.output is None
+        assert not (output_dir / path).with_suffix(".csv").exists()
+
+    assert sorted(p.name for p in output_dir.rglob("*")) == [
+        "day1.csv",
+        "day1.csv",
+        "day2.csv",
+        "device1",
+        "device2",
+        "truncated.csv",
+    ]
+
+
+def test_main_npy(timestamp_log, input_dir, tmp_path):
+    numpy = pytest.importorskip("numpy")
+    output_dir = tmp_path / "output"
+
+    assert (
+        batch.main(
+            [str(input_dir), str(output_dir), "--format", "npy", "--columns", "value"]
+        )
+        == 1
+    )
+
+    manifest = json.loads((output_dir / "manifest.json").read_text())
+    assert manifest["files"] == 6
+    assert manifest["failed"] == 2
+    assert manifest["rows"] == sum(r["rows"] for r in manifest["results"])
+    assert manifest["results"][0] == {
+        "path": "device1/day1.tablog",
+        "output": "device1/day1",
+        "rows": 1000,
+        "blocks": 10,
+        "framing_errors": [],
+        "field_names": ["value"],
+        "field_types": ["s16"],
+        "error": None,
+    }
+
+    values = numpy.load(output_dir / "device1" / "day2" / "value.npy")
+    assert values.tolist() == [v for _, v in timestamp_log.rows(10, 1000)]
+    assert not (output_dir / "device1" / "day2" / "timestamp.npy").exists()
@@ -1,5 +1,8 @@
 import tools.subprocess_iterator
 import tools.encoder_wrappers
+import datasets
+import pyencoder
+from decoder.int_type import IntType
 
 import pytest
 
@@ -10,6 +13,106 @@ def csv_encoder():
     return tools.encoder_wrappers.csv_encoder
 
 
+@pytest.fixture
+def multiblock_encoder(csv_encoder):
+    """Provides a callable that encodes a dataset into multiple blocks, by encoding
+    ranges of rows separately and concatenating the outputs.
+    Returns the encoded bytes and list of row counts of the blocks."""
+
+    def encode(dataset, block_size):
+        rows = list(dataset)
+        block_rows = [
+            rows[i : i + block_size] for i in range(0, max(len(rows), 1), block_size)
+        ]
+        encoded = b"".join(
+            b"".join(
+                csv_encoder(
+                    datasets.dataset.Dataset(
+                        dataset.name,
+                        dataset.field_names,
+                        dataset.field_types,
+                        lambda block=block: iter(block),
+                        len(block),
+                    )
+                )
+            )
+            for block in block_rows
+        )
+        return encoded, [len(block) for block in block_rows]
+
+    return encode
+
+
+def find_dataset(name):
+    """Return the dataset (including the synthetic ones) with the given name"""
+    (dataset,) = [
+        d for d in datasets.all_datasets(include_synthetic=True) if d.name == name
+    ]
+    return dataset
+
+
+@pytest.fixture
+def encoded_file(multiblock_encoder, tmp_path):
+    """Provides a callable that writes a dataset encoded into blocks of
+    block_size rows to a file. Returns the file path and row counts of the
+    blocks."""
+
+    def write(dataset, block_size):
+        encoded, block_rows = multiblock_encoder(dataset, block_size)
+        path = tmp_path / "data.tablog"
+        path.write_bytes(encoded)
+        return path, block_rows
+
+    return write
+
+
+@pytest.fixture
+def tph_file(encoded_file):
+    """Provides a callable that writes the dataset1/tph.csv dataset encoded
+    into blocks of block_size rows (a single block by default) to a file.
+    Returns the dataset, the file path and row counts of the blocks."""
+
+    def write(block_size=None):
+        dataset = find_dataset("dataset1/tph.csv")
+        if block_size is None:
+            block_size = len(list(dataset))
+        return (dataset,) + encoded_file(dataset, block_size)
+
+    return write
+
+
+class _TimestampLog:
+    field_names = ["timestamp", "value"]
+    field_types = [IntType(False, 32), IntType(True, 16)]
+
+    @staticmethod
+    def rows(count, offset=0):
+        return [[offset + i, (i * 37) % 1000 - 500] for i in range(count)]
+
+    @classmethod
+    def encode(cls, rows, block_size=100, field_names=None, field_types=None):
+        output = []
+        with pyencoder.TablogEncoder(
+            output.append,
+            cls.field_names if field_names is None else field_names,
+            cls.field_types if field_types is None else field_types,
+        ) as e:
+            for i in range(0, len(rows), block_size):
+                e.write_rows(rows[i : i + block_size])
+                e.end_block()
+        return b"".join(output)
+
+
+@pytest.fixture
+def timestamp_log():
+    """Provides a small two column log (timestamp, value): its field_names and
+    field_types, rows(count, offset=0) generating count rows with timestamps
+    starting at offset and encode(rows, block_size=100, field_names=None,
+    field_types=None) encoding rows with pyencoder into blocks of block_size
+    rows, optionally with other columns than the log's own."""
+    return _TimestampLog
+
+
 @pytest.fixture(scope="session")
 def stream_encoder():
     with tools.encoder_wrappers.StreamEncoder() as se:
@@ -0,0 +1,127 @@
+import pytest
+import datasets
+import pyencoder
+from decoder import convert
+from decoder.int_type import IntType
+
+import io
+import random
+import sys
+import types
+
+
+def test_csv_scaled_roundtrip(tph_file, tmp_path):
+    """CSV written with types and scaling reads back as the original dataset"""
+    dataset, path, _ = tph_file()
+    output = tmp_path / "output.csv"
+
+    # Same multipliers as in the source CSV
+    argv = ["csv", str(path), "-o", str(output), "--types"]
+    for name in ["pressure", "temperature1", "humidity", "temperature2"]:
+        argv += ["--scale", f"{name}=100"]
+    argv += ["--scale", "temperature3=10000"]
+    assert convert.main(argv) == 0
+
+    with open(output) as fp:
+        lines = fp.readlines()
+    converters, field_types = datasets.csv_datasets.parse_types(lines[1])
+    assert field_types == dataset.field_types
+    assert lines[0].strip().split(",") == dataset.field_names
+    assert [
+        [c(x) for c, x in zip(converters, line.split(","))] for line in lines[2:]
+    ] == list(dataset)
+
+
+def test_csv_stdin(tph_file, monkeypatch, capsys):
+    """Reading standard input, writing standard output, selected columns"""
+    dataset, path, _ = tph_file()
+    monkeypatch.setattr(sys, "stdin", types.SimpleNamespace(buffer=open(path, "rb")))
+
+    assert convert.main(["csv", "--columns", "humidity,timestamp"]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "humidity,timestamp"
+    assert lines[1:] == [f"{row[3]},{row[0]}" for row in dataset]
+
+
+def test_csv_stdin_single_block(monkeypatch):
+    """Standard input is decoded as it arrives, even if all of it is a single
+    block, so memory use doesn't depend on the input size"""
+    rng = random.Random(0)
+    rows = [[i] + [rng.getrandbits(32) for _ in range(3)] for i in range(20000)]
+    output = []
+    with pyencoder.TablogEncoder(
+        output.append, ["a", "b", "c", "d"], [IntType(False, 32)] * 4
+    ) as e:
+        e.write_rows(rows)
+    encoded = b"".join(output)
+    assert encoded.count(b"Tl") == 1
+
+    stdin = io.BytesIO(encoded)
+    read_positions = []  # Input bytes read when each piece of output was written
+
+    class Stdout(io.StringIO):
+        def write(self, s):
+            read_positions.append(stdin.tell())
+            return super().write(s)
+
+    stdout = Stdout()
+    monkeypatch.setattr(sys, "stdin", types.SimpleNamespace(buffer=stdin))
+    monkeypatch.setattr(sys, "stdout", stdout)
+    monkeypatch.setattr(convert, "_batch_rows", 1000)
+    monkeypatch.setattr(convert, "_input_chunk_size", 4096)
+
+    assert convert.main(["csv"]) == 0
+
+    lines = stdout.getvalue().splitlines()
+    assert lines[0] == "a,b,c,d"
+    assert [list(map(int, line.split(","))) for line in lines[1:]] == rows
+    # The header and the first batch of rows
+    assert read_positions[1] < len(encoded) // 10
+
+
+def test_npy(tph_file, tmp_path):
+    numpy = pytest.importorskip("numpy")
+    dataset, path, _ = tph_file()
+    output = tmp_path / "npy"
+
+    assert (
+        convert.main(["npy", str(path), "-o", str(output), "--scale", "humidity=100"])
+        == 0
+    )
+
+    rows = list(dataset)
+    for i, (name, t) in enumerate(zip(dataset.field_names, dataset.field_types)):
+        values = numpy.load(output / (name + ".npy"))
+        if name == "humidity":
+            assert values.dtype == numpy.float64
+            assert values.tolist() == [row[i] / 100 for row in rows]
+        else:
+            assert values.dtype == t.numpy_dtype()
+            assert values.tolist() == [row[i] for row in rows]
+
+
+def test_empty_input(tmp_path, capsys):
+    path = tmp_path / "empty.tablog"
+    path.write_bytes(b"")
+
+    assert convert.main(["csv", str(path)]) == 1
+    assert "No data to decode" in capsys.readouterr().err
+
+
+def test_unknown_scaled_column(tph_file, capsys):
+    _, path, _ = tph_file()
+    assert convert.main(["csv", str(path), "--scale", "nonexistent=10"]) == 1
+    assert "nonexistent" in capsys.readouterr().err
+
+
+def test_repeated_column(tph_file, capsys):
+    _, path, _ = tph_file()
+    assert convert.main(["csv", str(path), "--columns", "humidity,humidity"]) == 1
+    assert "Columns must not repeat" in capsys.readouterr().err
+
+
+def test_invalid_scale(tph_file):
+    _, path, _ = tph_file()
+    with pytest.raises(SystemExit):
+        convert.main(["csv", str(path), "--scale", "humidity=0.5"])
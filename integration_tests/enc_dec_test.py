@@ -2,8 +2,11 @@ import pytest
 import datasets
 import decoder as decoder_module
 
+import array
 
-@pytest.mark.parametrize(
+from .conftest import find_dataset
+
+all_datasets = pytest.mark.parametrize(
     "dataset",
     [
         pytest.param(
@@ -16,6 +19,9 @@ import decoder as decoder_module
         for dataset in datasets.all_datasets(include_synthetic=True)
     ],
 )
+
+
+@all_datasets
 @pytest.mark.dataset
 def test_dataset_encode_decode(csv_encoder, dataset):
     """Check that encoding and decoding a dataset generates identical values"""
@@ -31,3 +37,247 @@ def test_dataset_encode_decode(csv_encoder, dataset):
             assert decoded_row == dataset_row
     except csv_encoder.UnsupportedTypeSignature as e:  # pragma: no cover
         pytest.skip(str(e))
+
+
+def _transposed(dataset):
+    rows = list(dataset)
+    return [[row[i] for row in rows] for i in range(len(dataset.field_names))]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def column_type(request, monkeypatch):
+    """Run the test both with numpy output and with numpy unavailable"""
+    if request.param == "numpy":
+        numpy = pytest.importorskip("numpy")
+        return numpy.ndarray
+    else:
+        monkeypatch.setattr(decoder_module.decoder, "numpy", None)
+        return array.array
+
+
+@all_datasets
+@pytest.mark.dataset
+def test_dataset_read_columns(csv_encoder, dataset, column_type):
+    """Check that decoding to columns gives the same values as the dataset"""
+    try:
+        decoder = decoder_module.TablogDecoder(csv_encoder(dataset))
+        columns = decoder.read_columns()
+    except csv_encoder.UnsupportedTypeSignature as e:  # pragma: no cover
+        pytest.skip(str(e))
+
+    assert all(isinstance(column, column_type) for column in columns)
+    assert [list(column) for column in columns] == _transposed(dataset)
+    assert len(decoder.read_columns()[0]) == 0
+
+
+@all_datasets
+@pytest.mark.dataset
+def test_dataset_iter_column_batches(csv_encoder, dataset, column_type):
+    """Check that decoding column batches gives the same values as the dataset"""
+    batch_size = 37
+    try:
+        decoder = decoder_module.TablogDecoder(csv_encoder(dataset))
+        batches = list(decoder.iter_column_batches(batch_size))
+    except csv_encoder.UnsupportedTypeSignature as e:  # pragma: no cover
+        pytest.skip(str(e))
+
+    expected = _transposed(dataset)
+    assert all(len(batch[0]) == batch_size for batch in batches[:-1])
+    assert [
+        [v for batch in batches for v in batch[i]] for i in range(len(expected))
+    ] == expected
+
+
+@all_datasets
+@pytest.mark.dataset
+def test_dataset_to_numpy(csv_encoder, dataset):
+    pytest.importorskip("numpy")
+    try:
+        decoder = decoder_module.TablogDecoder(csv_encoder(dataset))
+        result = decoder.to_numpy()
+    except csv_encoder.UnsupportedTypeSignature as e:  # pragma: no cover
+        pytest.skip(str(e))
+
+    assert result.dtype.names == tuple(dataset.field_names)
+    assert [result.dtype[i] for i in range(len(dataset.field_types))] == [
+        t.numpy_dtype() for t in dataset.field_types
+    ]
+    assert [list(row) for row in result.tolist()] == list(dataset)
+
+
+def test_to_numpy_max_rows(csv_encoder):
+    pytest.importorskip("numpy")
+    dataset = find_dataset("dataset1/tph.csv")
+    decoder = decoder_module.TablogDecoder(csv_encoder(dataset))
+    rows = list(dataset)
+
+    first = decoder.to_numpy(max_rows=1000)
+    rest = decoder.to_numpy()
+    assert len(first) == 1000
+    assert [list(row) for row in first.tolist() + rest.tolist()] == rows
+
+
+def test_to_numpy_without_numpy(csv_encoder, monkeypatch):
+    monkeypatch.setattr(decoder_module.decoder, "numpy", None)
+    decoder = decoder_module.TablogDecoder(csv_encoder(find_dataset("dataset1/tph.csv")))
+    with pytest.raises(ImportError):
+        decoder.to_numpy()
+
+
+def test_multiblock_header_parsed_once(multiblock_encoder, monkeypatch):
+    """Identical headers of the following blocks are recognized without parsing"""
+    dataset = find_dataset("dataset1/tph.csv")
+    encoded, block_rows = multiblock_encoder(dataset, 50)
+    assert len(block_rows) > 1
+
+    calls = []
+    read_header = decoder_module.TablogDecoder._read_header
+
+    def counting_read_header(self):
+        calls.append(None)
+        return read_header(self)
+
+    monkeypatch.setattr(
+        decoder_module.TablogDecoder, "_read_header", counting_read_header
+    )
+
+    assert list(decoder_module.TablogDecoder(encoded)) == list(dataset)
+    assert len(calls) == 1
+
+
+def test_changed_header(csv_encoder):
+    encoded = b"".join(csv_encoder(find_dataset("dataset1/tph.csv"))) + b"".join(
+        csv_encoder(find_dataset("phone_imu/magnetometer.csv"))
+    )
+    with pytest.raises(decoder_module.exceptions.TablogError, match="have changed"):
+        list(decoder_module.TablogDecoder(encoded))
+
+
+@pytest.mark.parametrize(
+    "columns", [["power1"], ["power3", b"timestamp"], None], ids=str
+)
+def test_column_projection(multiblock_encoder, column_type, columns):
+    dataset = find_dataset("dataset1/power.csv")
+    encoded, _ = multiblock_encoder(dataset, 1000)
+    names = dataset.field_names if columns is None else columns
+    indices = [
+        dataset.field_names.index(c if isinstance(c, str) else c.decode("utf-8"))
+        for c in names
+    ]
+    expected = [[row[i] for i in indices] for row in dataset]
+
+    decoder = decoder_module.TablogDecoder(encoded, columns=columns)
+    assert list(decoder) == expected
+    assert decoder.field_names == [dataset.field_names[i].encode() for i in indices]
+    assert decoder.field_types == [dataset.field_types[i] for i in indices]
+
+    decoder = decoder_module.TablogDecoder(encoded, columns=columns)
+    assert [list(column) for column in decoder.read_columns()] == [
+        [row[i] for row in dataset] for i in indices
+    ]
+
+
+def test_column_projection_to_numpy(csv_encoder):
+    pytest.importorskip("numpy")
+    dataset = find_dataset("dataset1/power.csv")
+    decoder = decoder_module.TablogDecoder(
+        csv_encoder(dataset), columns=["power2", "timestamp"]
+    )
+    result = decoder.to_numpy()
+    assert result.dtype.names == ("power2", "timestamp")
+    assert result["timestamp"].tolist() == [row[0] for row in dataset]
+    assert result["power2"].tolist() == [row[6] for row in dataset]
+
+
+def test_column_projection_missing_column(csv_encoder):
+    encoded = csv_encoder(find_dataset("dataset1/tph.csv"))
+    with pytest.raises(decoder_module.exceptions.TablogError, match="nonexistent"):
+        list(decoder_module.TablogDecoder(encoded, columns=["nonexistent"]))
+
+
+@pytest.mark.parametrize("columns", [["a", b"a"], []], ids=str)
+def test_column_projection_invalid(columns):
+    with pytest.raises(ValueError):
+        decoder_module.TablogDecoder(b"", columns=columns)
+
+
+def test_decoder_stats(multiblock_encoder):
+    dataset = find_dataset("dataset1/tph.csv")
+    encoded, block_rows = multiblock_encoder(dataset, 1000)
+    rows = list(dataset)
+
+    decoder = decoder_module.TablogDecoder(encoded, stats=True)
+    assert list(decoder) == rows
+    stats = decoder.stats
+    assert stats.blocks == len(block_rows)
+    assert stats.rows == len(rows)
+    assert 0 < stats.bytes < len(encoded)
+    assert not stats.framing_errors
+
+    assert [column.name for column in stats.columns] == decoder.field_names
+    assert 0 < sum(column.bits for column in stats.columns) < 8 * stats.bytes
+    for column in stats.columns:
+        assert column.values == len(rows)
+        assert sum(column.golomb_states) == len(rows)
+        assert sum(column.selectors) == len(rows)
+        assert 0 <= column.hit_rate <= 1
+
+    # Reading columns gives the same statistics, including projected out fields
+    decoder = decoder_module.TablogDecoder(encoded, columns=["humidity"], stats=True)
+    assert [list(column) for column in decoder.read_columns(2000)] == [
+        [row[3] for row in rows[:2000]]
+    ]
+    decoder.read_columns()
+    for column, expected in zip(decoder.stats.columns, stats.columns):
+        assert column.name == expected.name
+        assert column.bits == expected.bits
+        assert column.hits == expected.hits
+        assert column.golomb_states == expected.golomb_states
+        if column.name == b"humidity":
+            assert column.selectors == expected.selectors
+        else:
+            assert sum(column.selectors) == 0
+    assert decoder.stats.rows == stats.rows
+
+
+def test_decoder_stats_chunked(multiblock_encoder):
+    encoded, _ = multiblock_encoder(find_dataset("dataset1/tph.csv"), 1000)
+    chunks = [encoded[i : i + 1000] for i in range(0, len(encoded), 1000)]
+
+    decoder = decoder_module.TablogDecoder(encoded, stats=True)
+    chunked_decoder = decoder_module.TablogDecoder(chunks, stats=True)
+    assert list(chunked_decoder) == list(decoder)
+    assert chunked_decoder.stats.blocks == decoder.stats.blocks
+    assert chunked_decoder.stats.bytes == decoder.stats.bytes
+
+
+def test_chunked_rows_before_block_end(csv_encoder):
+    """Rows of chunked input are decoded before their block is complete"""
+    dataset = find_dataset("dataset1/tph.csv")
+    encoded = b"".join(csv_encoder(dataset))
+    pulled = 0
+
+    def chunks():
+        nonlocal pulled
+        for i in range(0, len(encoded), 1024):
+            pulled += 1
+            yield encoded[i : i + 1024]
+
+    decoder = decoder_module.TablogDecoder(chunks())
+    assert next(iter(decoder)) == next(iter(dataset))
+    assert pulled < 3
+    assert list(decoder) == list(dataset)[1:]
+
+
+def test_decoder_stats_framing_errors(csv_encoder):
+    encoded = b"".join(csv_encoder(find_dataset("dataset1/tph.csv")))
+    decoder = decoder_module.TablogDecoder(encoded + b"junk", stats=True)
+    with pytest.raises(decoder_module.framing.UnexpectedCharacters):
+        list(decoder)
+    assert decoder.stats.framing_errors == {"UnexpectedCharacters": 1}
+    assert decoder.stats.blocks == 1
+
+
+def test_decoder_without_stats(csv_encoder):
+    decoder = decoder_module.TablogDecoder(csv_encoder(find_dataset("dataset1/tph.csv")))
+    assert decoder.stats is None
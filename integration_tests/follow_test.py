@@ -0,0 +1,99 @@
+import pyencoder
+import decoder as decoder_module
+
+import itertools
+import os
+import threading
+import time
+
+
+def _follow(path, **kwargs):
+    return decoder_module.TablogDecoder.follow(
+        path, poll_interval=0.001, timeout=1, **kwargs
+    )
+
+
+def test_follow_appended(timestamp_log, tmp_path):
+    """Data appended in small pieces from another thread get decoded"""
+    path = tmp_path / "log.tablog"
+    path.write_bytes(b"")
+    rows = timestamp_log.rows(1000)
+    encoded = timestamp_log.encode(rows)
+
+    def writer():
+        with open(path, "ab") as fp:
+            for i in range(0, len(encoded), 37):
+                fp.write(encoded[i : i + 37])
+                fp.flush()
+                time.sleep(0.001)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert list(_follow(path)) == rows
+    finally:
+        thread.join()
+
+
+def test_rows_before_block_end(timestamp_log, tmp_path):
+    """Rows of a block that is still being written are available"""
+    path = tmp_path / "log.tablog"
+    rows = timestamp_log.rows(200)
+    with open(path, "wb") as fp:
+        encoder = pyencoder.TablogEncoder(
+            fp.write, timestamp_log.field_names, timestamp_log.field_types
+        )
+        encoder.write_rows(rows[:100])
+        encoder.flush()
+        fp.flush()
+
+        followed = _follow(path)
+        assert list(itertools.islice(followed, 90)) == rows[:90]
+
+        encoder.write_rows(rows[100:])
+        encoder.end_block()
+        fp.flush()
+        assert list(followed) == rows[90:]
+
+
+def test_start_block(timestamp_log, tmp_path):
+    path = tmp_path / "log.tablog"
+    rows = timestamp_log.rows(1000)
+    # The last block is not complete yet, the index ends before it
+    path.write_bytes(timestamp_log.encode(rows)[:-10])
+
+    followed = list(_follow(path, start_block=-1))
+    assert 100 < len(followed) < 200
+    assert followed == rows[800 : 800 + len(followed)]
+
+    followed = list(_follow(path, start_block=5, columns=["value"]))
+    assert 400 < len(followed) < 500
+    assert followed == [[v] for _, v in rows[500 : 500 + len(followed)]]
+
+
+def test_truncated_restarts(timestamp_log, tmp_path):
+    path = tmp_path / "log.tablog"
+    first = timestamp_log.rows(300)
+    second = timestamp_log.rows(50, 10000)
+    path.write_bytes(timestamp_log.encode(first))
+
+    followed = _follow(path)
+    assert list(itertools.islice(followed, 300)) == first
+
+    path.write_bytes(timestamp_log.encode(second))  # Truncates the file
+    assert list(itertools.islice(followed, 50)) == second
+
+
+def test_replaced_restarts(timestamp_log, tmp_path):
+    path = tmp_path / "log.tablog"
+    first = timestamp_log.rows(300)
+    second = timestamp_log.rows(500, 10000)
+    path.write_bytes(timestamp_log.encode(first))
+
+    followed = _follow(path)
+    assert list(itertools.islice(followed, 300)) == first
+
+    new_path = tmp_path / "new.tablog"
+    new_path.write_bytes(timestamp_log.encode(second))
+    os.replace(new_path, path)
+    assert list(followed) == second
@@ -0,0 +1,306 @@
+import pytest
+import datasets
+import decoder as decoder_module
+from decoder import index
+from decoder.int_type import IntType
+import pyencoder
+
+import itertools
+import math
+import os
+
+from .conftest import find_dataset
+
+multiblock_datasets = pytest.mark.parametrize(
+    "dataset",
+    [
+        pytest.param(dataset, id=dataset.name)
+        for dataset in datasets.all_datasets(include_synthetic=True)
+        if dataset.name
+        in {
+            'empty("u8")',
+            'sine("s16", 100, length=5000)',
+            'random("u64", length=100)',
+            'count_up("s64", length=5000)',
+        }
+    ],
+)
+
+
+@multiblock_datasets
+@pytest.mark.dataset
+def test_build_index(encoded_file, dataset):
+    path, block_rows = encoded_file(dataset, 1000)
+    blocks = index.update_index(path)
+
+    assert [block.rows for block in blocks] == block_rows
+    assert blocks[0].offset == 0
+    for b1, b2 in zip(blocks, blocks[1:]):
+        assert b1.offset + b1.length == b2.offset
+    assert blocks[-1].offset + blocks[-1].length == path.stat().st_size
+
+    assert index.read_index(path) == (blocks, path.stat().st_size)
+
+
+@multiblock_datasets
+@pytest.mark.dataset
+@pytest.mark.parametrize("n", [0, 1, -1])
+def test_open_at_block(encoded_file, dataset, n):
+    path, block_rows = encoded_file(dataset, 1000)
+    n = min(n, len(block_rows) - 1)
+    skipped_rows = sum(block_rows[:n])
+
+    decoder = decoder_module.TablogDecoder.open_at_block(path, n)
+
+    expected = list(itertools.islice(dataset, skipped_rows, None))
+    assert list(decoder) == expected
+
+
+@multiblock_datasets
+@pytest.mark.dataset
+def test_update_index_appended(encoded_file, dataset):
+    """Check that the index gets updated when the file grows, including an
+    incomplete block at the end"""
+    path, _ = encoded_file(dataset, 1000)
+    complete_data = path.read_bytes()
+    first_block_end = index.build_index(complete_data)[0].length
+
+    # Last block is incomplete
+    path.write_bytes(complete_data[: first_block_end + 5])
+    assert index.update_index(path) == index.build_index(complete_data)[:1]
+
+    path.write_bytes(complete_data)
+    assert index.update_index(path) == index.build_index(complete_data)
+    assert index.read_index(path)[0] == index.build_index(complete_data)
+
+
+def test_junk_between_blocks(multiblock_encoder, tmp_path):
+    """Check that junk data before and between blocks is skipped by the index"""
+    dataset = next(datasets.synthetic.all_datasets([0]))
+    block, _ = multiblock_encoder(dataset, 1)
+    data = b"junk" + block + b"more junk" + block
+    path = tmp_path / "junk.tablog"
+    path.write_bytes(data)
+
+    blocks = index.update_index(path)
+    assert [(b.offset, b.length, b.rows) for b in blocks] == [
+        (4, len(block), 0),
+        (4 + len(block) + 9, len(block), 0),
+    ]
+
+
+def test_index_not_writable(tph_file, monkeypatch):
+    """Index that cannot be written is still used"""
+    dataset, path, block_rows = tph_file(1000)
+
+    def write_index(*args):
+        raise PermissionError("Read-only directory")
+
+    monkeypatch.setattr(index, "write_index", write_index)
+
+    assert [block.rows for block in index.update_index(path)] == block_rows
+    assert not os.path.exists(index.index_path(path))
+    assert (
+        list(decoder_module.TablogDecoder.open_at_block(path, -1))
+        == list(dataset)[-block_rows[-1] :]
+    )
+    assert len(index.matching_blocks(path, [("timestamp", ">=", 0)])) == len(block_rows)
+
+
+def test_undecodable_block(tmp_path, monkeypatch):
+    """Block that fails to decode is indexed without rows, the others stay
+    usable"""
+    field_types = [IntType(False, 8)]
+    output = []
+    with pyencoder.TablogEncoder(output.append, ["v"], field_types) as encoder:
+        encoder.write_rows([[1], [2]])
+    monkeypatch.setattr(pyencoder.encoder, "format_version", 1)
+    with pyencoder.TablogEncoder(output.append, ["v"], field_types) as encoder:
+        encoder.write_rows([[3]])
+    monkeypatch.undo()
+    with pyencoder.TablogEncoder(output.append, ["v"], field_types) as encoder:
+        encoder.write_rows([[4], [5]])
+    path = tmp_path / "data.tablog"
+    path.write_bytes(b"".join(output))
+
+    blocks = index.update_index(path)
+    assert [block.rows for block in blocks] == [2, 0, 2]
+    assert blocks[0].error is None
+    assert blocks[1].error.startswith("UnsupportedVersionError")
+    assert index.read_index(path)[0] == blocks
+
+    assert list(decoder_module.TablogDecoder.open_at_block(path, 2)) == [[4], [5]]
+    assert index.matching_blocks(path, [("v", ">", 3)]) == blocks[2:]
+    assert list(index.iter_filtered_rows(path, [("v", "!=", 2)])) == [[1], [4], [5]]
+
+
+@multiblock_datasets
+@pytest.mark.dataset
+def test_from_path(encoded_file, dataset):
+    path, _ = encoded_file(dataset, 1000)
+    assert list(decoder_module.TablogDecoder.from_path(path)) == list(dataset)
+
+
+def test_from_path_empty(tmp_path):
+    path = tmp_path / "empty.tablog"
+    path.write_bytes(b"")
+    with pytest.raises(decoder_module.exceptions.InputEmptyError):
+        decoder_module.TablogDecoder.from_path(path)
+
+
+@multiblock_datasets
+@pytest.mark.dataset
+def test_zone_maps(encoded_file, dataset):
+    path, block_rows = encoded_file(dataset, 1000)
+    rows = list(dataset)
+
+    blocks = index.update_index(path)
+    for block, start in zip(blocks, itertools.accumulate([0] + block_rows)):
+        block_data = rows[start : start + block.rows]
+        if block_data:
+            assert block.minimums == [min(column) for column in zip(*block_data)]
+            assert block.maximums == [max(column) for column in zip(*block_data)]
+        else:
+            assert block.minimums == block.maximums == []
+
+
+@pytest.mark.parametrize(
+    "predicates",
+    [
+        [("humidity", ">", 3300)],
+        [("humidity", "<=", 3190)],
+        [("humidity", ">=", 3200), (b"humidity", "<", 3205), ("timestamp", "!=", 0)],
+        [("pressure", "==", 97960)],
+        [],
+    ],
+    ids=str,
+)
+def test_iter_filtered_rows(tph_file, predicates):
+    dataset, path, _ = tph_file(200)
+    fields = {name: i for i, name in enumerate(dataset.field_names)}
+    ops = {op: test for op, (test, _) in index._operators.items()}
+
+    def matches(row):
+        return all(
+            ops[op](
+                row[fields[column if isinstance(column, str) else column.decode()]],
+                value,
+            )
+            for column, op, value in predicates
+        )
+
+    expected = [row for row in dataset if matches(row)]
+    blocks = index.matching_blocks(path, predicates)
+    assert sum(block.rows for block in blocks) >= len(expected)
+    if predicates:
+        assert len(blocks) < len(index.update_index(path))
+
+    assert list(index.iter_filtered_rows(path, predicates)) == expected
+    assert list(
+        index.iter_filtered_rows(path, predicates, columns=["temperature1"])
+    ) == [[row[fields["temperature1"]]] for row in expected]
+
+
+def test_matching_blocks_errors(encoded_file):
+    dataset = next(datasets.synthetic.all_datasets([0]))
+    path, _ = encoded_file(dataset, 1000)
+    with pytest.raises(decoder_module.exceptions.TablogError):
+        index.matching_blocks(path, [("nonexistent", "<", 0)])
+    with pytest.raises(ValueError):
+        index.matching_blocks(path, [(dataset.field_names[0], "~", 0)])
+
+
+def _timestamp_range_cases():
+    dataset = find_dataset("dataset1/tph.csv")
+    timestamps = [row[0] for row in dataset]
+    return [
+        (timestamps[0] - 10, timestamps[0] + 1),
+        (timestamps[1000], timestamps[1010]),
+        (timestamps[1000] + 1, timestamps[1999]),
+        (timestamps[-5], timestamps[-1] + 1),
+        (timestamps[-1] + 1, timestamps[-1] + 2),
+        (timestamps[0], timestamps[-1] + 1),
+        (timestamps[20], timestamps[10]),
+    ]
+
+
+@pytest.mark.parametrize("with_index", [False, True])
+@pytest.mark.parametrize("start, stop", _timestamp_range_cases())
+def test_range(tph_file, start, stop, with_index):
+    dataset, path, _ = tph_file(100)
+    if with_index:
+        index.update_index(path)
+
+    expected = [row for row in dataset if start <= row[0] < stop]
+    assert list(decoder_module.TablogDecoder.range(path, "timestamp", start, stop)) == (
+        expected
+    )
+    assert list(
+        decoder_module.TablogDecoder.range(
+            path, b"timestamp", start, stop, columns=["humidity"]
+        )
+    ) == [[row[3]] for row in expected]
+
+
+@pytest.mark.parametrize(
+    "rows, block_size",
+    [
+        ([[5, 1], [10, 2], [10, 3], [11, 4]], 2),
+        ([[10, 1], [10, 2], [10, 3], [10, 4], [10, 5], [12, 6]], 2),
+        ([[1, 1], [10, 2], [10, 3], [10, 4], [10, 5], [12, 6]], 1),
+    ],
+)
+@pytest.mark.parametrize("with_index", [False, True])
+def test_range_repeated_values(tmp_path, rows, block_size, with_index):
+    """Values repeated across a block boundary are all found"""
+    path = tmp_path / "data.tablog"
+    with open(path, "wb") as fp:
+        with pyencoder.TablogEncoder(
+            fp.write, ["t", "v"], [IntType(False, 8), IntType(False, 8)]
+        ) as encoder:
+            for i in range(0, len(rows), block_size):
+                encoder.write_rows(rows[i : i + block_size])
+                encoder.end_block()
+            encoder.end_block()  # Empty block at the end
+    if with_index:
+        index.update_index(path)
+
+    for start, stop in itertools.product(range(13), repeat=2):
+        assert list(decoder_module.TablogDecoder.range(path, "t", start, stop)) == [
+            row for row in rows if start <= row[0] < stop
+        ]
+
+
+@pytest.mark.parametrize("with_index", [False, True])
+def test_range_decodes_few_blocks(tph_file, monkeypatch, with_index):
+    dataset, path, _ = tph_file(100)
+    if with_index:
+        index.update_index(path)
+    timestamps = [row[0] for row in dataset]
+
+    blocks_read = []
+    next_block = decoder_module.TablogDecoder._next_block
+
+    def counting_next_block(self):
+        blocks_read.append(None)
+        return next_block(self)
+
+    monkeypatch.setattr(
+        decoder_module.TablogDecoder, "_next_block", counting_next_block
+    )
+    rows = list(
+        decoder_module.TablogDecoder.range(
+            path, "timestamp", timestamps[1050], timestamps[1150]
+        )
+    )
+    assert len(rows) == 100
+    # Header of the first block for field names, then two blocks with data
+    # and the final empty _next_block call
+    expected_blocks = 4
+    if not with_index:
+        # Blocks with the first row decoded in the two binary searches
+        expected_blocks += 2 * math.ceil(
+            math.log2(len(index.block_spans(path.read_bytes()))) + 1
+        )
+    assert len(blocks_read) <= expected_blocks
+    assert os.path.exists(index.index_path(path)) == with_index
@@ -0,0 +1,99 @@
+import pytest
+from decoder import merge
+from decoder import exceptions
+from decoder.int_type import IntType
+
+import random
+
+_field_names = ["timestamp", "device", "value"]
+_field_types = [IntType(True, 64), IntType(False, 8), IntType(True, 16)]
+
+
+def _write_files(tmp_path, encoded_files):
+    """Write each of the encoded files to tmp_path, return list of their paths"""
+    paths = []
+    for i, encoded in enumerate(encoded_files):
+        path = tmp_path / f"{i}.tablog"
+        path.write_bytes(encoded)
+        paths.append(path)
+    return paths
+
+
+def _encode(timestamp_log, rows, block_size=1000, field_names=_field_names):
+    return timestamp_log.encode(rows, block_size, field_names, _field_types)
+
+
+def _device_rows(gen, device, count):
+    timestamp = gen.randrange(1000)
+    rows = []
+    for _ in range(count):
+        timestamp += gen.choice([0, 1, 1, 5, 100])
+        rows.append([timestamp, device, gen.randrange(-1000, 1000)])
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merge(timestamp_log, tmp_path, seed):
+    gen = random.Random(seed)
+    sources = [_device_rows(gen, i, gen.randrange(3000)) for i in range(6)]
+    sources.append([])  # Empty block only
+    paths = _write_files(
+        tmp_path,
+        [_encode(timestamp_log, rows, gen.randrange(1, 1000)) for rows in sources],
+    )
+    empty_path = tmp_path / "empty.tablog"
+    empty_path.write_bytes(b"")
+    paths.append(empty_path)
+
+    expected = sorted(
+        ((i, row) for i, rows in enumerate(sources) for row in rows),
+        key=lambda item: (item[1][0], item[0]),
+    )
+    assert list(merge.merge_files(paths, "timestamp")) == expected
+
+
+def test_merge_columns(timestamp_log, tmp_path):
+    gen = random.Random(0)
+    sources = [_device_rows(gen, i, 500) for i in range(3)]
+    paths = _write_files(
+        tmp_path,
+        [
+            _encode(timestamp_log, rows, field_names=n)
+            for rows, n in zip(
+                sources, [_field_names, ["timestamp", "x", "value"], _field_names]
+            )
+        ],
+    )
+
+    expected = sorted(
+        ((i, row) for i, rows in enumerate(sources) for row in rows),
+        key=lambda item: (item[1][0], item[0]),
+    )
+    assert list(merge.merge_files(paths, b"timestamp", ["value"])) == [
+        (i, [row[2]]) for i, row in expected
+    ]
+    assert list(merge.merge_files(paths, "timestamp", ["value", "timestamp"])) == [
+        (i, [row[2], row[0]]) for i, row in expected
+    ]
+
+
+def test_decreasing_column(timestamp_log, tmp_path):
+    paths = _write_files(
+        tmp_path,
+        [
+            _encode(timestamp_log, [[1, 0, 0], [3, 0, 0], [2, 0, 0]]),
+            _encode(timestamp_log, [[2, 1, 0]]),
+        ],
+    )
+    merged = merge.merge_files((path for path in paths), "timestamp")
+    assert next(merged) == (0, [1, 0, 0])
+    assert next(merged) == (1, [2, 1, 0])
+    assert next(merged) == (0, [3, 0, 0])
+    with pytest.raises(exceptions.TablogError, match=paths[0].name):
+        next(merged)
+
+
+def test_missing_column(timestamp_log, tmp_path):
+    paths = _write_files(tmp_path, [_encode(timestamp_log, [[1, 0, 0]])])
+    with pytest.raises(exceptions.TablogError):
+        list(merge.merge_files(paths, "time"))
@@ -0,0 +1,62 @@
+import pytest
+import datasets
+import decoder as decoder_module
+from tools import parallel_encoder
+
+import io
+import os.path
+
+from .conftest import find_dataset
+
+
+def _write_csv(dataset, path):
+    with open(path, "w") as fp:
+        fp.write(",".join(dataset.field_names) + "\n")
+        fp.write(",".join(map(str, dataset.field_types)) + "\n")
+        for row in dataset:
+            fp.write(",".join(map(str, row)) + "\n")
+
+
+@pytest.mark.parametrize(
+    "name, block_rows",
+    [
+        ('empty("u8")', 10),
+        ('sine("s16", 100, length=100)', 1),
+        ('sine("s16", 100, length=5000)', 777),
+        ('random("u64", length=5000)', 5000),
+        ('count_up("s64", length=100)', 1000),
+    ],
+)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_identical_to_multiblock(
+    multiblock_encoder, tmp_path, name, block_rows, workers
+):
+    """Parallel encoding gives the same output as encoding the blocks one by one"""
+    dataset = find_dataset(name)
+    csv_path = tmp_path / "data.csv"
+    _write_csv(dataset, csv_path)
+
+    expected, expected_block_rows = multiblock_encoder(dataset, block_rows)
+    output = io.BytesIO()
+    row_counts = parallel_encoder.encode_csv(csv_path, output, block_rows, workers)
+
+    assert output.getvalue() == expected
+    assert row_counts == expected_block_rows
+
+
+def test_scaled_csv(tmp_path):
+    """Converted (float scaled) CSV values decode identically to the dataset"""
+    dataset = find_dataset("dataset1/tph.csv")
+    csv_path = os.path.join(os.path.dirname(datasets.__file__), dataset.name)
+    output_path = tmp_path / "data.tablog"
+
+    assert (
+        parallel_encoder.main(
+            [csv_path, str(output_path), "--block-rows", "500", "--workers", "2"]
+        )
+        == 0
+    )
+
+    decoder = decoder_module.TablogDecoder.from_path(output_path)
+    assert decoder.field_names == [n.encode("utf-8") for n in dataset.field_names]
+    assert list(decoder) == list(dataset)
@@ -0,0 +1,49 @@
+import pytest
+import datasets
+import decoder as decoder_module
+from decoder import parallel
+
+
+@pytest.mark.parametrize(
+    "dataset",
+    [
+        pytest.param(dataset, id=dataset.name)
+        for dataset in datasets.all_datasets(include_synthetic=True)
+        if dataset.name
+        in {
+            'empty("s16")',
+            'sine("u64", 100, length=5000)',
+            'random_step("s16", 100, length=5000)',
+        }
+    ],
+)
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("block_size", [100, 1000])
+@pytest.mark.dataset
+def test_parallel_decode(multiblock_encoder, tmp_path, dataset, workers, block_size):
+    encoded, _ = multiblock_encoder(dataset, block_size)
+    path = tmp_path / "data.tablog"
+    path.write_bytes(encoded)
+
+    expected = list(decoder_module.TablogDecoder(encoded))
+
+    columns = parallel.decode_file(path, workers=workers)
+    assert [list(row) for row in zip(*columns)] == expected
+    assert list(parallel.iter_rows(path, workers=workers)) == expected
+
+    columns = parallel.decode_file(path, workers=workers, columns=[b"value"])
+    assert [list(row) for row in zip(*columns)] == [[row[-1]] for row in expected]
+
+
+def test_parallel_empty_file(tmp_path):
+    path = tmp_path / "empty.tablog"
+    path.write_bytes(b"")
+    with pytest.raises(decoder_module.exceptions.InputEmptyError):
+        parallel.decode_file(path)
+
+
+def test_parallel_framing_error(tmp_path):
+    path = tmp_path / "junk.tablog"
+    path.write_bytes(b"junk")
+    with pytest.raises(decoder_module.framing.UnexpectedCharacters):
+        parallel.decode_file(path)
@@ -0,0 +1,36 @@
+import pytest
+from decoder import profiling
+
+import pstats
+
+
+@pytest.mark.parametrize("cprofile", [False, True])
+def test_profile_file(tph_file, cprofile):
+    dataset, path, block_rows = tph_file(1000)
+    result = profiling.profile_file(path, cprofile=cprofile)
+
+    assert result.rows == len(list(dataset))
+    assert result.blocks == len(block_rows)
+    assert list(result.times) == list(profiling.phases)
+    assert all(t >= 0 for t in result.times.values())
+    assert result.times["entropy decoding"] > 0
+    assert result.times["reconstruction"] > 0
+    assert sum(result.times.values()) == pytest.approx(result.total, rel=0.05)
+
+    report = result.report()
+    assert all(phase in report for phase in profiling.phases)
+
+    if cprofile:
+        functions = {name for _, _, name in result.stats.stats}
+        assert "phase_entropy_decoding" in functions
+    else:
+        assert result.stats is None
+
+
+def test_profile_main(tph_file, tmp_path, capsys):
+    _, path, _ = tph_file(1000)
+    output = tmp_path / "out.pstats"
+    profiling.main([str(path), "--columns", "humidity", "--pstats", str(output)])
+
+    assert "entropy decoding" in capsys.readouterr().out
+    pstats.Stats(str(output))
@@ -0,0 +1,134 @@
+import pytest
+import datasets
+import decoder as decoder_module
+from decoder import framing
+from pyencoder import encoder as encoder_module
+
+import random
+
+
+def _datasets(*names):
+    return [
+        dataset
+        for dataset in datasets.all_datasets(include_synthetic=True)
+        if dataset.name in names
+    ]
+
+
+push_datasets = pytest.mark.parametrize(
+    "dataset",
+    [
+        pytest.param(dataset, id=dataset.name)
+        for dataset in _datasets(
+            'empty("u8")',
+            'sine("s16", 100, length=5000)',
+            'random("u64", length=100)',
+            "dataset1/tph.csv",
+        )
+    ],
+)
+
+
+def _push_decode(encoded, chunk_sizes):
+    """Feed the encoded data to a push decoder in chunks of given sizes
+    (repeating the sizes as necessary), return all rows"""
+    decoder = decoder_module.TablogPushDecoder()
+    rows = []
+    pos = 0
+    while pos < len(encoded):
+        for size in chunk_sizes:
+            rows.extend(decoder.feed(encoded[pos : pos + size]))
+            pos += size
+    rows.extend(decoder.finish())
+    return rows, decoder
+
+
+@push_datasets
+@pytest.mark.dataset
+@pytest.mark.parametrize("block_size", [100, 100000])
+@pytest.mark.parametrize("seed", range(3))
+def test_push_decoder_random_chunks(multiblock_encoder, dataset, block_size, seed):
+    encoded, _ = multiblock_encoder(dataset, block_size)
+    expected = list(decoder_module.TablogDecoder(encoded))
+
+    rng = random.Random(seed)
+    chunk_sizes = [rng.randint(0, 50) for _ in range(100)] + [1]
+    rows, decoder = _push_decode(encoded, chunk_sizes)
+
+    assert rows == expected
+    assert decoder.field_names == [name.encode("utf-8") for name in dataset.field_names]
+    assert decoder.field_types == dataset.field_types
+
+
+@push_datasets
+@pytest.mark.dataset
+def test_push_decoder_byte_by_byte(csv_encoder, dataset):
+    encoded = b"".join(csv_encoder(dataset))
+    expected = list(decoder_module.TablogDecoder(encoded))
+
+    rows, _ = _push_decode(encoded, [1])
+    assert rows == expected
+
+
+def test_push_decoder_returns_rows_early(csv_encoder):
+    """Rows must be available before the end of the block"""
+    (dataset,) = _datasets('sine("s16", 100, length=5000)')
+    encoded = b"".join(csv_encoder(dataset))
+
+    decoder = decoder_module.TablogPushDecoder()
+    rows = decoder.feed(encoded[: len(encoded) // 2])
+    assert 0 < len(rows) < 5000
+    rows.extend(decoder.feed(encoded[len(encoded) // 2 :]))
+    rows.extend(decoder.finish())
+    assert rows == list(dataset)
+
+
+def test_push_decoder_framing_error(multiblock_encoder):
+    (dataset,) = _datasets('count_up("s16", length=100)')
+    encoded, _ = multiblock_encoder(dataset, 30)
+    split = encoded.index(b"Tl", 1)
+
+    decoder = decoder_module.TablogPushDecoder()
+    with pytest.raises(framing.UnexpectedCharacters):
+        decoder.feed(encoded[:split] + b"junk" + encoded[split:])
+    rows = decoder.finish()
+
+    assert rows == list(dataset)
+
+
+def test_push_decoder_decoding_error(timestamp_log, monkeypatch):
+    """Rows decoded before an error in the same chunk are not lost"""
+    first = timestamp_log.rows(50)
+    last = timestamp_log.rows(20, 50)
+    encoded = timestamp_log.encode(first)
+    monkeypatch.setattr(encoder_module, "format_version", 1)
+    encoded += timestamp_log.encode(timestamp_log.rows(10))
+    monkeypatch.undo()
+    encoded += timestamp_log.encode(last)
+
+    decoder = decoder_module.TablogPushDecoder()
+    with pytest.raises(decoder_module.exceptions.UnsupportedVersionError):
+        decoder.feed(encoded)
+    assert decoder.finish() == first + last
+
+
+def test_push_decoder_empty():
+    decoder = decoder_module.TablogPushDecoder()
+    assert decoder.feed(b"") == []
+    with pytest.raises(decoder_module.exceptions.InputEmptyError):
+        decoder.finish()
+
+
+def test_push_decoder_column_projection(multiblock_encoder):
+    (dataset,) = _datasets("dataset1/tph.csv")
+    encoded, _ = multiblock_encoder(dataset, 100)
+
+    decoder = decoder_module.TablogPushDecoder(columns=["humidity", "timestamp"])
+    rows = []
+    for pos in range(0, len(encoded), 37):
+        rows.extend(decoder.feed(encoded[pos : pos + 37]))
+    rows.extend(decoder.finish())
+
+    assert decoder.field_names == [b"humidity", b"timestamp"]
+    humidity = dataset.field_names.index("humidity")
+    assert rows == [[row[humidity], row[0]] for row in dataset]
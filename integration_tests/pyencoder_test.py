@@ -0,0 +1,158 @@
+import pytest
+import hypothesis
+import decoder as decoder_module
+import pyencoder
+from pyencoder import encoder as encoder_module
+from decoder.int_type import IntType
+from decoder.tests import strategies
+
+from .conftest import find_dataset
+from .enc_dec_test import all_datasets
+
+
+def _encode(field_names, field_types, rows):
+    """Encode rows into a single block using the Python encoder, return the
+    encoded bytes"""
+    output = []
+    encoder = pyencoder.TablogEncoder(output.append, field_names, field_types)
+    encoder.write_rows(rows)
+    encoder.end_block()
+    return b"".join(output)
+
+
+@all_datasets
+@pytest.mark.dataset
+def test_dataset_identical_to_csv_encoder(csv_encoder, dataset):
+    """Check that the Python encoder gives byte for byte the same output as
+    the C++ one"""
+    try:
+        expected = b"".join(csv_encoder(dataset))
+    except csv_encoder.UnsupportedTypeSignature as e:  # pragma: no cover
+        pytest.skip(str(e))
+
+    assert _encode(dataset.field_names, dataset.field_types, list(dataset)) == expected
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1000])
+def test_multiblock_identical(multiblock_encoder, block_size):
+    dataset = find_dataset('sine("s16", 100, length=5000)')
+    expected, _ = multiblock_encoder(dataset, block_size)
+    rows = list(dataset)
+    output = []
+    with pyencoder.TablogEncoder(
+        output.append, dataset.field_names, dataset.field_types
+    ) as encoder:
+        for i in range(0, len(rows), block_size):
+            encoder.write_rows(rows[i : i + block_size])
+            encoder.end_block()
+
+    assert b"".join(output) == expected
+
+
+def test_write_row_equals_write_rows():
+    dataset = find_dataset('random("u64", length=5000)')
+    rows = list(dataset)
+
+    output = []
+    with pyencoder.TablogEncoder(
+        output.append, dataset.field_names, dataset.field_types
+    ) as encoder:
+        for row in rows[:1000]:
+            encoder.write_row(row)
+        encoder.write_rows(iter(rows[1000:3000]))
+        encoder.write_columns(list(zip(*rows[3000:])))
+
+    assert b"".join(output) == _encode(dataset.field_names, dataset.field_types, rows)
+
+
+@hypothesis.given(
+    values=strategies.typed_lists(min_size=1),
+    name=hypothesis.strategies.binary(max_size=50),
+)
+@hypothesis.example(values=(IntType(False, 8), [ord("T"), ord("l")] * 10), name=b"Tl")
+@hypothesis.example(
+    values=(IntType(False, 16), [0x6C54, 0x2354, 0x2054] * 10), name=b"T#T T"
+)
+def test_roundtrip(values, name):
+    """Encoding any values of any type must decode back, including types that
+    the C++ test driver doesn't support and data that need escaping."""
+    int_type, lst = values
+    encoded = _encode([name, name + b"2"], [int_type, int_type], [(v, v) for v in lst])
+    decoder = decoder_module.TablogDecoder(encoded)
+
+    assert decoder.field_names == [name, name + b"2"]
+    assert decoder.field_types == [int_type, int_type]
+    assert list(decoder) == [[v, v] for v in lst]
+
+
+@hypothesis.given(s=hypothesis.strategies.binary(max_size=1000))
+@hypothesis.example(s=b"tion")
+@hypothesis.example(s=b"@#$%")
+@hypothesis.example(s=b"")
+@hypothesis.example(s=b"timestamp")
+def test_string_encoding(stream_encoder, s):
+    """Field names must be compressed identically to the C++ encoder"""
+    writer = encoder_module._BitCollector()
+    encoder_module._encode_string(s, writer)
+    writer.write(1, 1)  # The C++ stream ends with a 1 bit and padding
+    expected = stream_encoder.call("string", s)
+
+    assert writer.bits.to_bytes(len(expected), "little") == expected
+    assert writer.bit_count <= 8 * len(expected) < writer.bit_count + 8
+
+
+def test_empty_block():
+    encoded = _encode(["x"], [IntType(True, 32)], [])
+    decoder = decoder_module.TablogDecoder(encoded)
+
+    assert decoder.field_names == [b"x"]
+    assert list(decoder) == []
+
+
+def test_close_without_rows():
+    output = []
+    with pyencoder.TablogEncoder(output.append, ["x"], [IntType(True, 32)]):
+        pass
+
+    assert output == []
+
+
+def test_value_out_of_range():
+    encoder = pyencoder.TablogEncoder(lambda b: None, ["x"], [IntType(False, 8)])
+    with pytest.raises(ValueError):
+        encoder.write_row([256])
+    with pytest.raises(ValueError):
+        encoder.write_row([-1])
+
+
+@pytest.mark.parametrize("first_rows", [[], [[1, 1]]])
+def test_rejected_row_leaves_stream_decodable(first_rows):
+    """A row rejected because of a later column doesn't change the encoder"""
+    types = [IntType(False, 8), IntType(False, 8)]
+    output = []
+    with pyencoder.TablogEncoder(output.append, ["a", "b"], types) as encoder:
+        encoder.write_rows(first_rows)
+        with pytest.raises(ValueError):
+            encoder.write_row([50, 300])
+        encoder.write_row([2, 2])
+
+    assert b"".join(output) == _encode(["a", "b"], types, first_rows + [[2, 2]])
+    decoder = decoder_module.TablogDecoder(b"".join(output))
+    assert list(decoder) == first_rows + [[2, 2]]
+
+
+def test_wrong_row_length():
+    encoder = pyencoder.TablogEncoder(
+        lambda b: None, ["x", "y"], [IntType(False, 8), IntType(False, 8)]
+    )
+    with pytest.raises(ValueError):
+        encoder.write_row([1])
+    with pytest.raises(ValueError):
+        encoder.write_columns([[1, 2], [3]])
+
+
+def test_mismatched_fields():
+    with pytest.raises(ValueError):
+        pyencoder.TablogEncoder(lambda b: None, ["x", "y"], [IntType(False, 8)])
+    with pytest.raises(ValueError):
+        pyencoder.TablogEncoder(lambda b: None, [], [])
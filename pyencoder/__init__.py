@@ -0,0 +1,3 @@
+from .encoder import TablogEncoder
+
+__all__ = ["TablogEncoder"]
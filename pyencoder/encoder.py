@@ -0,0 +1,349 @@
+"""Pure Python implementation of the Tablog encoder.
+
+Produces output identical to the C++ `tablog::Tablog` class. Values are
+encoded one column at a time, like the decoder reconstructs them
+(see decoder.row_decoder), into (code, bit length) pairs that only get
+interleaved into the row order when writing them to the bit stream."""
+
+from __future__ import annotations
+
+from decoder import row_decoder
+from decoder import string
+from decoder import decoder_utils
+from decoder.int_type import IntType
+
+import collections.abc
+import re
+from typing import Callable, Union
+
+format_version = 0  # Version of the Tablog format written
+
+_golomb_state_shift = decoder_utils.AdaptiveExpGolombDecoder._state_shift
+
+_escape_re = re.compile(rb"T(?=[l# ])")
+_start_mark = b"Tl"
+_end_mark = b"T#"
+
+_flush_bits = 4096  # Complete bytes are moved out of the bit buffer past this size
+_output_buffer_size = 65536  # Encoded data are passed to sink past this size
+
+
+def _symbol_codes(node, code=0, length=0):
+    """Yield (symbol, code, code length) for all symbols of the string trie"""
+    if isinstance(node, bytes):
+        yield (node, code, length)
+    else:
+        for bit in (0, 1):
+            yield from _symbol_codes(node[bit], code | bit << length, length + 1)
+
+
+_string_codes = {
+    symbol: (code, length)
+    for symbol, code, length in _symbol_codes(string._decoder_trie)
+}
+_max_symbol_length = max(len(symbol) for symbol in _string_codes)
+
+
+class TablogEncoder:
+    """Encodes rows of integer values into blocks of Tablog data.
+
+    sink: Callable that receives the encoded data as bytes objects (for example
+        `write` method of a binary file). Data are buffered and passed to sink
+        at the end of every block, when the buffer grows large, or on flush().
+    field_names: Names of the fields (str or bytes).
+    field_types: IntType of each field.
+
+    Blocks are started automatically by writing rows and ended by end_block()
+    or close(). Using the encoder as a context manager closes it at the end."""
+
+    def __init__(
+        self,
+        sink: Callable[[bytes], object],
+        field_names: collections.abc.Sequence[Union[str, bytes]],
+        field_types: collections.abc.Sequence[IntType],
+    ):
+        if len(field_names) != len(field_types):
+            raise ValueError("Number of field names and field types must match")
+        if not field_types:
+            raise ValueError("At least one field is required")
+
+        self._sink = sink
+        self.field_names = [
+            name.encode("utf-8") if isinstance(name, str) else bytes(name)
+            for name in field_names
+        ]
+        self.field_types = list(field_types)
+        self._header = self._encode_header()
+
+        self._output = bytearray()  # Encoded data, not passed to sink yet
+        self._had_escape = False  # Last data byte was an escape byte
+        self._bits = 0  # Bits not yet output as bytes
+        self._bit_count = 0  # Number of valid bits in self._bits
+        self._state = None  # Encoder state per field, None outside of block
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_row(self, row: collections.abc.Sequence[int]):
+        """Encode a single row of values."""
+        self.write_rows([row])
+
+    def write_rows(self, rows: collections.abc.Iterable[collections.abc.Sequence[int]]):
+        """Encode multiple rows of values. Faster than calling write_row for
+        each of them."""
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return
+        field_count = len(self.field_types)
+        if any(len(row) != field_count for row in rows):
+            raise ValueError(f"Every row must have {field_count} values")
+        self.write_columns(list(zip(*rows)))
+
+    def write_columns(
+        self, columns: collections.abc.Sequence[collections.abc.Sequence[int]]
+    ):
+        """Encode rows given as a sequence of columns of equal length."""
+        if len(columns) != len(self.field_types):
+            raise ValueError(f"Expected {len(self.field_types)} columns")
+        row_count = len(columns[0])
+        if any(len(column) != row_count for column in columns):
+            raise ValueError("All columns must have the same length")
+        if not row_count:
+            return
+
+        # Columns are encoded with copies of the states, so that a rejected
+        # value leaves the encoder unchanged
+        states = self._state if self._state is not None else self._initial_state()
+        states = [list(state) for state in states]
+        encoded = [
+            _encode_column(t, state, column)
+            for t, state, column in zip(self.field_types, states, columns)
+        ]
+
+        if self._state is None:
+            self._start_block()
+        self._state = states
+        self._write_codes(encoded)
+
+    def end_block(self):
+        """End the current block. Writes an empty block when no block was
+        started."""
+        if self._state is None:
+            self._start_block()
+        self._write_bits(1, 1)  # End of bit stream, padded to whole byte
+        self._write_bits(0, -self._bit_count % 8)
+        self._flush_bits()
+        self._output += _end_mark
+        self._had_escape = False
+        self._state = None
+        self.flush()
+
+    def flush(self):
+        """Pass all complete bytes encoded so far to sink."""
+        self._flush_bits()
+        if self._output:
+            self._sink(bytes(self._output))
+            self._output.clear()
+
+    def close(self):
+        """End the current block if there is one and flush the output."""
+        if self._state is not None:
+            self.end_block()
+        else:
+            self.flush()
+
+    def _start_block(self):
+        self._output += _start_mark
+        self._had_escape = False
+        self._write_bits(*self._header)
+        self._state = self._initial_state()
+
+    def _initial_state(self):
+        return [
+            [0, 0, 0, (t.bitsize // 8) << _golomb_state_shift] for t in self.field_types
+        ]
+
+    def _encode_header(self):
+        """Return the block header as (bits, bit count)"""
+        writer = _BitCollector()
+        writer.elias_gamma(format_version)
+        writer.elias_gamma(len(self.field_types) - 1)
+        for name in self.field_names:
+            _encode_string(name, writer)
+        for t in self.field_types:
+            writer.write(int(t.signed), 1)
+            writer.write(t.bytesize().bit_length() - 1, 2)
+        return writer.bits, writer.bit_count
+
+    def _write_bits(self, bits, count):
+        self._bits |= bits << self._bit_count
+        self._bit_count += count
+        if self._bit_count >= _flush_bits:
+            self._flush_bits()
+
+    def _write_codes(self, encoded):
+        """Interleave encoded columns (lists of codes and lists of their lengths)
+        into the bit stream row by row."""
+        bits = self._bits
+        bit_count = self._bit_count
+        codes = [c for c, _ in encoded]
+        lengths = [l for _, l in encoded]
+        for row_codes, row_lengths in zip(zip(*codes), zip(*lengths)):
+            for code, length in zip(row_codes, row_lengths):
+                bits |= code << bit_count
+                bit_count += length
+            if bit_count >= _flush_bits:
+                self._bits = bits
+                self._bit_count = bit_count
+                self._flush_bits()
+                bits = self._bits
+                bit_count = self._bit_count
+                if len(self._output) >= _output_buffer_size:
+                    self.flush()
+        self._bits = bits
+        self._bit_count = bit_count
+
+    def _flush_bits(self):
+        """Move complete bytes from the bit buffer to the output, escaping
+        the data bytes that would form marks."""
+        byte_count = self._bit_count // 8
+        if not byte_count:
+            return
+        data = (self._bits & ((1 << (8 * byte_count)) - 1)).to_bytes(
+            byte_count, "little"
+        )
+        self._bits >>= 8 * byte_count
+        self._bit_count -= 8 * byte_count
+
+        if self._had_escape and data[0] in b"l# ":
+            self._output += b" "
+        self._output += _escape_re.sub(b"T ", data)
+        self._had_escape = data[-1] == _start_mark[0]
+
+
+def _encode_column(t, state, values):
+    """Encode values of a single field, update its state
+    ([value before last, last value, Adapt selector, Golomb state]).
+    Returns list of codes and list of their bit lengths."""
+    minimum, maximum = t.minmax()
+    if min(values) < minimum or max(values) > maximum:
+        raise ValueError(f"Value out of range of type {t}")
+    value_range = maximum - minimum + 1
+    lowest_selector = -row_decoder.selector_max
+    highest_selector = row_decoder.selector_max - 1
+    max_golomb_state = (t.bitsize << _golomb_state_shift) - 1
+
+    h, l, s, g = state
+    codes = []
+    lengths = []
+    code_append = codes.append
+    length_append = lengths.append
+
+    for v in values:
+        linear = 2 * l - h
+        if linear > maximum:
+            linear -= value_range
+        elif linear < minimum:
+            linear += value_range
+        prediction = l if s >= 0 else linear
+
+        error_last = abs(l - v)
+        error_linear = abs(linear - v)
+        if error_last < error_linear:
+            if s < highest_selector:
+                s += 1
+        elif error_last > error_linear:
+            if s > lowest_selector:
+                s -= 1
+        h = l
+        l = v
+
+        if prediction == v:
+            code_append(1)
+            length_append(1)
+            continue
+
+        if prediction > v:
+            high = 2
+            n = prediction - v - 1
+        else:
+            high = 0
+            n = v - prediction - 1
+
+        # Hit bit (0), high bit, Elias gamma coded quotient, remainder
+        k = g >> _golomb_state_shift
+        p = n >> k
+        p1 = p + 1
+        bits = p1.bit_length() - 1
+        code_append(
+            high
+            | ((1 | (p1 & ((1 << bits) - 1)) << 1) << (2 + bits))
+            | (n & ((1 << k) - 1)) << (3 + 2 * bits)
+        )
+        length_append(3 + 2 * bits + k)
+
+        if p == 0:
+            if g > 0:
+                g -= 1
+        elif p > 1 and g < max_golomb_state:
+            g += 1
+
+    state[:] = (h, l, s, g)
+    return codes, lengths
+
+
+class _BitCollector:
+    """Collects bits of the block header into a single int"""
+
+    def __init__(self):
+        self.bits = 0
+        self.bit_count = 0
+
+    def write(self, value, count):
+        self.bits |= (value & ((1 << count) - 1)) << self.bit_count
+        self.bit_count += count
+
+    def elias_gamma(self, n):
+        n += 1
+        bits = n.bit_length() - 1
+        self.write(0, bits)
+        self.write(1, 1)
+        self.write(n, bits)
+
+
+def _encode_string(s, writer):
+    """Encode a string (bytes) as alternating groups of symbols from the trie
+    and of plain bytes, the same way as the C++ encoder does."""
+    pos = 0
+    match_group = True  # The first group is always a match group, possibly empty
+    while True:
+        start = pos
+        if match_group:
+            symbols = []
+            while pos < len(s):
+                for length in range(min(_max_symbol_length, len(s) - pos), 0, -1):
+                    symbol = _string_codes.get(s[pos : pos + length])
+                    if symbol is not None:
+                        symbols.append(symbol)
+                        pos += length
+                        break
+                else:
+                    break
+            writer.elias_gamma(len(symbols))
+            for code, length in symbols:
+                writer.write(code, length)
+        else:
+            while pos < len(s) and s[pos : pos + 1] not in _string_codes:
+                pos += 1
+            writer.elias_gamma(pos - start)
+            for c in s[start:pos]:
+                writer.write(c, 8)
+
+        if pos == len(s):
+            break
+        match_group = not match_group
+
+    writer.elias_gamma(0)
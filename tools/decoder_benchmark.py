@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""Measures decoding speed of TablogDecoder on all available datasets (both the
+CSV based and the synthetic ones) and compares the results with a baseline.
+
+Usage:
+    python -m tools.decoder_benchmark [--output results.json]
+        [--baseline baseline.json] [--threshold 0.1] [--repeat 5] [--filter RE]
+
+Each dataset is encoded once, then decoded both row by row (iteration) and
+column-wise (read_columns), best time of several repetitions is kept.
+Peak memory is measured using tracemalloc in a separate run, because tracing
+slows the decoding down.
+
+With a baseline (results JSON from an earlier run), every rows/s figure that
+dropped by more than the threshold (relative) is reported as a regression
+and the script exits with status 1. See tools/Readme.md for recording
+a baseline."""
+
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+
+from . import encoder_wrappers
+from .compression_ratio_comparison import format_size
+import datasets
+import decoder
+
+modes = {
+    "iter": lambda d: sum(1 for _ in d),
+    "columns": lambda d: len(d.read_columns()[0]),
+}
+
+
+def measure(encoded, mode, repeat):
+    """Return best decoding time in seconds and the number of rows decoded."""
+    decode = modes[mode]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = decode(decoder.TablogDecoder(encoded))
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def measure_peak_memory(encoded, mode):
+    """Return peak memory allocated while decoding, in bytes."""
+    tracemalloc.start()
+    try:
+        modes[mode](decoder.TablogDecoder(encoded))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_dataset(dataset, repeat):
+    encoded = b"".join(encoder_wrappers.csv_encoder(dataset))
+    result = {"encoded_size": len(encoded)}
+    for mode in modes:
+        seconds, rows = measure(encoded, mode, repeat)
+        result[mode] = {
+            "seconds": seconds,
+            "rows": rows,
+            "mb_per_s": len(encoded) / seconds / 1e6,
+            "rows_per_s": rows / seconds,
+            "peak_memory": measure_peak_memory(encoded, mode),
+        }
+    return result
+
+
+def run_benchmarks(all_datasets, repeat):
+    results = {}
+    for dataset in all_datasets:
+        try:
+            results[dataset.name] = benchmark_dataset(dataset, repeat)
+        except encoder_wrappers.UnsupportedTypeSignature:
+            continue
+        print_result(dataset.name, results[dataset.name])
+    return results
+
+
+def print_result(name, result):
+    for mode in modes:
+        r = result[mode]
+        print(
+            f"{name:<50} {mode:<8}"
+            f" {r['mb_per_s']:8.2f} MB/s {r['rows_per_s']:12.0f} rows/s"
+            f" peak {format_size(r['peak_memory']):>9}"
+        )
+
+
+def find_regressions(results, baseline, threshold):
+    """Yield (dataset name, mode, baseline rows/s, current rows/s) for every
+    measurement that is slower than baseline by more than threshold."""
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for mode in modes:
+            try:
+                old = baseline[name][mode]["rows_per_s"]
+            except KeyError:
+                continue
+            new = result[mode]["rows_per_s"]
+            if new < old * (1 - threshold):
+                yield name, mode, old, new
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.decoder_benchmark",
+        description="Measure decoding speed on all datasets.",
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with results from this file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown reported as a regression (default 0.1)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of timed runs per measurement"
+    )
+    parser.add_argument("--filter", help="Only run datasets with names matching RE")
+    args = parser.parse_args(argv)
+
+    all_datasets = datasets.all_datasets(include_synthetic=True)
+    if args.filter is not None:
+        pattern = re.compile(args.filter)
+        all_datasets = (d for d in all_datasets if pattern.search(d.name))
+
+    # Loaded before running, the output may overwrite the baseline file
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, "r") as fp:
+            baseline = json.load(fp)["results"]
+
+    results = run_benchmarks(all_datasets, args.repeat)
+
+    if args.output is not None:
+        with open(args.output, "w") as fp:
+            json.dump({"results": results}, fp, indent=2)
+
+    if baseline is not None:
+        regressions = list(find_regressions(results, baseline, args.threshold))
+        for name, mode, old, new in regressions:
+            print(
+                f"Regression: {name} {mode}: {old:.0f} -> {new:.0f} rows/s"
+                f" ({100 * new / old - 100:+.1f} %)"
+            )
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
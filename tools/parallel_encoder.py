@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""Encodes a CSV file into a multi-block Tablog file using multiple processes.
+
+Usage:
+    python -m tools.parallel_encoder INPUT.csv OUTPUT [--block-rows N]
+        [--workers N]
+
+The CSV file has the same format as the files in datasets (field names on the
+first line, types on the second one). Blocks are independent, so rows of the
+file are split into blocks of block_rows rows, each block gets encoded by its
+own csv_tests driver process and the outputs are written in the original
+order. The result decodes to the same rows as a single block file would."""
+
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import os
+import sys
+
+from . import encoder_wrappers
+import datasets
+
+# Blocks being encoded or waiting to be written, per worker process.
+# Limits the memory used when the output is written slower than encoded.
+_blocks_in_flight_per_worker = 4
+
+default_block_rows = 100000
+
+
+def encode_csv(csv_path, output, block_rows=default_block_rows, workers=None):
+    """Encode CSV file at csv_path, write the encoded blocks to binary file
+    object output.
+    workers is the number of processes used, defaults to the number of CPUs.
+    Returns list of row counts of the written blocks."""
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with open(csv_path, "r") as fp:
+        field_names = [x.strip() for x in next(fp).split(",")]
+        types_line = next(fp)
+        blocks = _split_lines(fp, block_rows)
+
+        if workers == 1:
+            encoded = (_encode_block(field_names, types_line, b) for b in blocks)
+            return _write_blocks(encoded, output)
+
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = _bounded_submit(
+                executor,
+                workers * _blocks_in_flight_per_worker,
+                _encode_block,
+                field_names,
+                types_line,
+                blocks,
+            )
+            return _write_blocks((f.result() for f in futures), output)
+
+
+def _split_lines(fp, block_rows):
+    """Yield lists of up to block_rows lines, at least one (possibly empty)"""
+    lines = list(itertools.islice(fp, block_rows))
+    yield lines
+    while True:
+        lines = list(itertools.islice(fp, block_rows))
+        if not lines:
+            return
+        yield lines
+
+
+def _bounded_submit(executor, max_pending, function, field_names, types_line, blocks):
+    """Submit encoding of the blocks to executor, yield futures in order,
+    keeping at most max_pending of them unfinished or unconsumed."""
+    pending = collections.deque()
+    for block in blocks:
+        if len(pending) >= max_pending:
+            yield pending.popleft()
+        pending.append(executor.submit(function, field_names, types_line, block))
+    yield from pending
+
+
+def _write_blocks(encoded_blocks, output):
+    row_counts = []
+    for row_count, encoded in encoded_blocks:
+        output.write(encoded)
+        row_counts.append(row_count)
+    return row_counts
+
+
+def _encode_block(field_names, types_line, lines):
+    """Encode CSV lines into a single block.
+    Returns number of rows and the encoded bytes."""
+    converters, field_types = datasets.csv_datasets.parse_types(types_line)
+    rows = [
+        [converter(x) for converter, x in zip(converters, line.split(","))]
+        for line in lines
+    ]
+    block = datasets.dataset.Dataset(
+        "", field_names, field_types, lambda: iter(rows), len(rows)
+    )
+    return len(rows), b"".join(encoder_wrappers.csv_encoder(block))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.parallel_encoder",
+        description="Encode a CSV file into Tablog blocks in parallel.",
+    )
+    parser.add_argument("input", help="CSV file")
+    parser.add_argument("output", help="Encoded file")
+    parser.add_argument(
+        "--block-rows",
+        type=int,
+        default=default_block_rows,
+        help=f"Rows per block (default {default_block_rows})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of processes, defaults to the number of CPUs",
+    )
+    args = parser.parse_args(argv)
+
+    if args.block_rows < 1:
+        parser.error("--block-rows must be positive")
+
+    with open(args.output, "wb") as fp:
+        row_counts = encode_csv(args.input, fp, args.block_rows, args.workers)
+
+    print(f"{sum(row_counts)} rows in {len(row_counts)} blocks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())